@@ -1,14 +1,48 @@
 """Quick validation of the 5000-pair JSONL dataset."""
 import json
 import re
-from collections import Counter
+from collections import Counter, deque
 
 SPIDER_PREFIX = (
     "tables: ai_documents (id, source_table, file_name, project_name, "
     "searchable_text, metadata, document_type) | query: "
 )
 VALID_TABLES = ["Expenses", "CashFlow", "Project", "Quotation", "QuotationItem"]
+VALID_TABLE_SET = frozenset(VALID_TABLES)
 CUSTOM_KEYS = ["Driver", "Supplier", "Remarks", "Method", "Description", "Notes", "Reference"]
+SOURCE_TABLE_PREFIX = "source_table = '"
+DOC_TYPE_PREFIX = "document_type = '"
+CUSTOM_KEY_MARKERS = tuple("metadata->>'" + ck + "'" for ck in CUSTOM_KEYS)
+
+# Metadata keys whose coverage is reported; markers are built once and
+# matched in the main pass so the file is only parsed a single time.
+key_patterns = [
+    "Category", "Expenses", "Name",  # Expenses
+    "Type", "Amount",  # CashFlow (Category shared)
+    "project_name", "client_name", "location", "status",  # Project
+    "quote_number", "total_amount",  # Quotation (status, project_name shared)
+    "plate_no", "dr_no", "material", "quarry_location", "truck_type", "volume", "line_total",  # QuotationItem
+]
+KEY_MARKERS = [(k, "metadata->>'" + k + "'") for k in key_patterns]
+
+
+def quoted_values(text, prefix):
+    """Return the distinct quoted literals that follow *prefix* in *text*.
+
+    Scans for the shared prefix once and reads the value up to the closing
+    quote, instead of testing one full marker string per candidate value.
+    """
+    found = set()
+    pos = text.find(prefix)
+    while pos != -1:
+        start = pos + len(prefix)
+        end = text.find("'", start)
+        if end == -1:
+            break
+        found.add(text[start:end])
+        pos = text.find(prefix, end + 1)
+    return found
+
 
 errors = []
 source_counts = Counter()
@@ -16,12 +50,20 @@ intent_counts = Counter()
 doc_type_counts = Counter()
 features = Counter()
 duplicate_targets = Counter()
+all_keys_found = Counter()
+first_lines = []
+last_lines = deque(maxlen=3)
 valid = 0
 
 FILE = "t5_text2sql_5000_pairs.jsonl"
 
 with open(FILE, "r", encoding="utf-8") as f:
     for i, line in enumerate(f, 1):
+        # Keep raw first/last lines for the sample report (no re-read)
+        if i <= 3:
+            first_lines.append(line)
+        last_lines.append(line)
+
         line = line.strip()
         if not line:
             continue
@@ -34,6 +76,11 @@ with open(FILE, "r", encoding="utf-8") as f:
         inp = pair.get("input", "")
         tgt = pair.get("target", "")
 
+        # Metadata key coverage counts every parsed line, valid or not
+        for k, marker in KEY_MARKERS:
+            if marker in tgt:
+                all_keys_found[k] += 1
+
         if "input" not in pair or "target" not in pair:
             errors.append(f"Line {i}: Missing input/target")
             continue
@@ -56,20 +103,17 @@ with open(FILE, "r", encoding="utf-8") as f:
             continue
 
         # Check source_table
-        found_tables = []
-        for t in VALID_TABLES:
-            marker = "source_table = '" + t + "'"
-            if marker in tgt:
-                found_tables.append(t)
-                source_counts[t] += 1
+        found_tables = quoted_values(tgt, SOURCE_TABLE_PREFIX) & VALID_TABLE_SET
+        source_counts.update(found_tables)
         if not found_tables:
             errors.append(f"Line {i}: No source_table filter")
             continue
 
         # Check document_type
-        if "document_type = 'file'" in tgt:
+        doc_types = quoted_values(tgt, DOC_TYPE_PREFIX)
+        if "file" in doc_types:
             doc_type_counts["file"] += 1
-        elif "document_type = 'row'" in tgt:
+        elif "row" in doc_types:
             doc_type_counts["row"] += 1
         else:
             errors.append(f"Line {i}: No document_type filter")
@@ -100,10 +144,8 @@ with open(FILE, "r", encoding="utf-8") as f:
             features["between"] += 1
 
         # Custom keys
-        for ck in CUSTOM_KEYS:
-            if "metadata->>'" + ck + "'" in tgt:
-                features["custom_keys"] += 1
-                break
+        if any(marker in tgt for marker in CUSTOM_KEY_MARKERS):
+            features["custom_keys"] += 1
 
         # Intent detection
         if "SUM(" in tgt_upper:
@@ -114,7 +156,7 @@ with open(FILE, "r", encoding="utf-8") as f:
             intent_counts["count"] += 1
         elif "DISTINCT" in tgt_upper:
             intent_counts["list_categories"] += 1
-        elif "document_type = 'file'" in tgt:
+        elif "file" in doc_types:
             intent_counts["list_files"] += 1
         elif "GROUP BY" in tgt_upper:
             intent_counts["compare"] += 1
@@ -128,45 +170,19 @@ with open(FILE, "r", encoding="utf-8") as f:
         valid += 1
 
 
-# --- Check metadata key coverage ---
-all_keys_found = Counter()
-key_patterns = [
-    "Category", "Expenses", "Name",  # Expenses
-    "Type", "Amount",  # CashFlow (Category shared)
-    "project_name", "client_name", "location", "status",  # Project
-    "quote_number", "total_amount",  # Quotation (status, project_name shared)
-    "plate_no", "dr_no", "material", "quarry_location", "truck_type", "volume", "line_total",  # QuotationItem
-]
-
-with open(FILE, "r", encoding="utf-8") as f:
-    for line in f:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            pair = json.loads(line)
-        except Exception:
-            continue
-        tgt = pair.get("target", "")
-        for k in key_patterns:
-            if "metadata->>'" + k + "'" in tgt:
-                all_keys_found[k] += 1
-
 # --- Sample first/last pairs ---
 samples_first = []
 samples_last = []
-with open(FILE, "r", encoding="utf-8") as f:
-    all_lines = f.readlines()
-    for line in all_lines[:3]:
-        try:
-            samples_first.append(json.loads(line.strip()))
-        except Exception:
-            pass
-    for line in all_lines[-3:]:
-        try:
-            samples_last.append(json.loads(line.strip()))
-        except Exception:
-            pass
+for line in first_lines:
+    try:
+        samples_first.append(json.loads(line.strip()))
+    except Exception:
+        pass
+for line in last_lines:
+    try:
+        samples_last.append(json.loads(line.strip()))
+    except Exception:
+        pass
 
 # --- Report ---
 exact_dupes = sum(1 for c in duplicate_targets.values() if c > 1)
@@ -27,8 +27,8 @@ import argparse
 import json
 import hashlib
 import logging
+import random
 import re
-import sys
 from collections import Counter
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -43,10 +43,27 @@ SPIDER_PREFIX = (
     "tables: ai_documents (id, source_table, file_name, project_name, "
     "searchable_text, metadata, document_type) | query: "
 )
-VALID_SOURCE_TABLES = {"Expenses", "CashFlow", "Project", "Quotation", "QuotationItem"}
+VALID_SOURCE_TABLES = frozenset({"Expenses", "CashFlow", "Project", "Quotation", "QuotationItem"})
+SOURCE_TABLE_PREFIX = "source_table = '"
 NUMERIC_KEYS = {"Expenses", "Amount", "total_amount", "volume", "line_total"}
 DISALLOWED_SQL = {"INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "CREATE", "TRUNCATE"}
 
+# Common AI typos in source_table values, fixed by clean_pair()
+SOURCE_TABLE_TYPO_FIXES = (
+    ("source_table = 'expenses'", "source_table = 'Expenses'"),
+    ("source_table = 'cashflow'", "source_table = 'CashFlow'"),
+    ("source_table = 'Cashflow'", "source_table = 'CashFlow'"),
+    ("source_table = 'cash_flow'", "source_table = 'CashFlow'"),
+    ("source_table = 'project'", "source_table = 'Project'"),
+    ("source_table = 'quotation'", "source_table = 'Quotation'"),
+    ("source_table = 'quotationitem'", "source_table = 'QuotationItem'"),
+    ("source_table = 'QuotationItems'", "source_table = 'QuotationItem'"),
+    ("source_table = 'Quotation_Item'", "source_table = 'QuotationItem'"),
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_METADATA_ARROW_RE = re.compile(r"metadata->'(\w+)'")
+
 
 # ---------------------------------------------------------------------------
 # Cleaning functions
@@ -54,10 +71,34 @@ DISALLOWED_SQL = {"INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "CREATE", "TRUN
 def normalize_sql(sql: str) -> str:
     """Normalize SQL for deduplication: lowercase, collapse whitespace, strip semicolons."""
     sql = sql.strip().rstrip(";").strip()
-    sql = re.sub(r"\s+", " ", sql)
+    sql = _WHITESPACE_RE.sub(" ", sql)
     return sql.lower()
 
 
+def quoted_values(text: str, prefix: str) -> set:
+    """
+    Return the distinct quoted literals that follow *prefix* in *text*.
+
+    Scans for the shared prefix once and reads each value up to its closing
+    quote, rather than testing one full marker string per candidate value.
+    """
+    found = set()
+    pos = text.find(prefix)
+    while pos != -1:
+        start = pos + len(prefix)
+        end = text.find("'", start)
+        if end == -1:
+            break
+        found.add(text[start:end])
+        pos = text.find(prefix, end + 1)
+    return found
+
+
+def source_tables_in(sql: str) -> set:
+    """Return the valid source_table values filtered on in *sql*."""
+    return quoted_values(sql, SOURCE_TABLE_PREFIX) & VALID_SOURCE_TABLES
+
+
 def fingerprint(pair: Dict) -> str:
     """Create a hash fingerprint for deduplication based on normalized target SQL."""
     normalized = normalize_sql(pair.get("target", ""))
@@ -97,7 +138,7 @@ def validate_custom_pair(pair: Dict) -> Tuple[bool, Optional[str]]:
 
     # Check SELECT only
     tgt_stripped = tgt.strip()
-    if not tgt_stripped.upper().startswith("SELECT"):
+    if tgt_stripped[:6].upper() != "SELECT":
         return False, f"not a SELECT statement"
 
     first_word = tgt_stripped.split()[0].upper()
@@ -105,8 +146,7 @@ def validate_custom_pair(pair: Dict) -> Tuple[bool, Optional[str]]:
         return False, f"disallowed SQL: {first_word}"
 
     # Check source_table filter
-    has_source = any(f"source_table = '{t}'" in tgt for t in VALID_SOURCE_TABLES)
-    if not has_source:
+    if not source_tables_in(tgt):
         return False, "missing source_table filter"
 
     # Check document_type filter
@@ -132,22 +172,13 @@ def clean_pair(pair: Dict) -> Dict:
     tgt = tgt.replace(";;", ";")
 
     # Fix common AI typos in source_table values
-    typo_fixes = {
-        "source_table = 'expenses'": "source_table = 'Expenses'",
-        "source_table = 'cashflow'": "source_table = 'CashFlow'",
-        "source_table = 'Cashflow'": "source_table = 'CashFlow'",
-        "source_table = 'cash_flow'": "source_table = 'CashFlow'",
-        "source_table = 'project'": "source_table = 'Project'",
-        "source_table = 'quotation'": "source_table = 'Quotation'",
-        "source_table = 'quotationitem'": "source_table = 'QuotationItem'",
-        "source_table = 'QuotationItems'": "source_table = 'QuotationItem'",
-        "source_table = 'Quotation_Item'": "source_table = 'QuotationItem'",
-    }
-    for wrong, right in typo_fixes.items():
-        tgt = tgt.replace(wrong, right)
+    for wrong, right in SOURCE_TABLE_TYPO_FIXES:
+        if wrong in tgt:
+            tgt = tgt.replace(wrong, right)
 
     # Fix metadata access: metadata->'key' → metadata->>'key'
-    tgt = re.sub(r"metadata->'(\w+)'", r"metadata->>'\1'", tgt)
+    if "metadata->'" in tgt:
+        tgt = _METADATA_ARROW_RE.sub(r"metadata->>'\1'", tgt)
 
     pair["target"] = tgt
     return pair
@@ -280,29 +311,24 @@ def run_pipeline(
     6. Shuffle
     7. Write clean output
     """
-    import random
-
     all_custom = []
     for f in custom_files:
         all_custom.extend(load_custom_jsonl(f))
 
-    # --- Step 1: Clean ---
-    cleaned = [clean_pair(p) for p in all_custom]
-    logger.info(f"Cleaned {len(cleaned)} custom pairs")
-
-    # --- Step 2: Validate ---
+    # --- Steps 1 & 2: Clean + validate in a single pass ---
     valid = []
     invalid_count = 0
     invalid_reasons = Counter()
 
-    for p in cleaned:
-        ok, reason = validate_custom_pair(p)
+    for p in all_custom:
+        ok, reason = validate_custom_pair(clean_pair(p))
         if ok:
             valid.append(p)
         else:
             invalid_count += 1
-            invalid_reasons[reason] = invalid_reasons.get(reason, 0) + 1
+            invalid_reasons[reason] += 1
 
+    logger.info(f"Cleaned {len(all_custom)} custom pairs")
     logger.info(f"Validation: {len(valid)} valid, {invalid_count} invalid")
     if invalid_reasons:
         logger.info("Top invalid reasons:")
@@ -332,15 +358,17 @@ def run_pipeline(
     logger.info(f"Deduplication: removed {dupes} duplicates, {len(deduped)} remaining")
 
     # --- Step 6: Shuffle ---
-    random.seed(42)
-    random.shuffle(deduped)
+    # Shuffle an index array rather than the pair dicts themselves; the
+    # seeded permutation is identical, and the pairs stay in place.
+    order = list(range(len(deduped)))
+    random.Random(42).shuffle(order)
 
     # --- Step 7: Write output ---
     out = Path(output_path)
     out.parent.mkdir(parents=True, exist_ok=True)
     with out.open("w", encoding="utf-8") as f:
-        for p in deduped:
-            f.write(json.dumps(p, ensure_ascii=False) + "\n")
+        for i in order:
+            f.write(json.dumps(deduped[i], ensure_ascii=False) + "\n")
 
     # --- Stats ---
     custom_count = len(valid)
@@ -352,9 +380,7 @@ def run_pipeline(
         # Only count intents for custom pairs
         if p.get("input", "").startswith(SPIDER_PREFIX):
             intent_dist[detect_intent(p)] += 1
-            for t in VALID_SOURCE_TABLES:
-                if f"source_table = '{t}'" in tgt:
-                    source_dist[t] += 1
+            source_dist.update(source_tables_in(tgt))
 
     summary = {
         "total_output": len(deduped),
@@ -25,10 +25,13 @@ import argparse
 import json
 import random
 import re
+import sys
 import hashlib
 import logging
-import sys
+import os
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
@@ -42,9 +45,13 @@ SPIDER_PREFIX = (
     "searchable_text, metadata, document_type) | query: "
 )
 
-VALID_SOURCE_TABLES = ["Expenses", "CashFlow", "Project", "Quotation", "QuotationItem"]
+VALID_SOURCE_TABLES = tuple(
+    sys.intern(t) for t in ("Expenses", "CashFlow", "Project", "Quotation", "QuotationItem")
+)
 
-NUMERIC_KEYS = {"Expenses", "Amount", "total_amount", "volume", "line_total"}
+NUMERIC_KEYS = frozenset(
+    sys.intern(k) for k in ("Expenses", "Amount", "total_amount", "volume", "line_total")
+)
 
 # Metadata keys per source table
 SCHEMA = {
@@ -57,6 +64,23 @@ SCHEMA = {
         "truck_type", "volume", "line_total",
     ],
 }
+# Table names and metadata keys are interned so the SCHEMA / NUMERIC_KEYS /
+# per-table lookups on the adaptation hot path compare keys by identity.
+SCHEMA = {
+    sys.intern(t): tuple(sys.intern(k) for k in keys) for t, keys in SCHEMA.items()
+}
+
+# SCHEMA split into numeric / non-numeric keys once, so the adaptation hot
+# path picks from these instead of re-filtering SCHEMA per pair. Single-key
+# "is numeric" checks stay as NUMERIC_KEYS membership: with interned keys
+# that is one identity-compared hash probe, cheaper in CPython than
+# looking up a key's index to test a bit.
+_NUM_BY_TABLE = {
+    t: tuple(k for k in keys if k in NUMERIC_KEYS) for t, keys in SCHEMA.items()
+}
+_NONNUM_BY_TABLE = {
+    t: tuple(k for k in keys if k not in NUMERIC_KEYS) for t, keys in SCHEMA.items()
+}
 
 # HuggingFace datasets to try (ordered by priority)
 DATASETS = [
@@ -170,6 +194,61 @@ ENTITY_POOLS = {
 # ============================================================================
 # DATASET DOWNLOAD & EVALUATION
 # ============================================================================
+# Per-row SQL feature bits used by evaluate_dataset()
+_SQL_FLAG_SELECT = 1
+_SQL_FLAG_AGGREGATE = 2
+_SQL_FLAG_WHERE = 4
+_SQL_FLAG_GROUP_BY = 8
+_SQL_FLAG_JOIN = 16
+
+# Upper-cased _SQL_TOKEN_RE match -> feature bit
+_TOKEN_FLAGS = {
+    "SUM(": _SQL_FLAG_AGGREGATE,
+    "AVG(": _SQL_FLAG_AGGREGATE,
+    "COUNT(": _SQL_FLAG_AGGREGATE,
+    "MAX(": _SQL_FLAG_AGGREGATE,
+    "MIN(": _SQL_FLAG_AGGREGATE,
+    "WHERE": _SQL_FLAG_WHERE,
+    "GROUP BY": _SQL_FLAG_GROUP_BY,
+    "JOIN": _SQL_FLAG_JOIN,
+}
+
+# evaluate_dataset() stat -> the bit it counts
+_SQL_FLAG_STATS = (
+    ("select_only", _SQL_FLAG_SELECT),
+    ("has_aggregate", _SQL_FLAG_AGGREGATE),
+    ("has_where", _SQL_FLAG_WHERE),
+    ("has_group_by", _SQL_FLAG_GROUP_BY),
+    ("has_join", _SQL_FLAG_JOIN),
+)
+
+# Every keyword evaluate_dataset() looks for, matched case-insensitively in
+# one left-to-right pass so the SQL never has to be upper-cased. No token's
+# suffix is another token's prefix, so non-overlapping matching finds each
+# one that occurs.
+_SQL_TOKEN_RE = re.compile(
+    r"SUM\(|AVG\(|COUNT\(|MAX\(|MIN\(|WHERE|GROUP BY|JOIN", re.IGNORECASE
+)
+_SELECT_RE = re.compile(r"\s*SELECT", re.IGNORECASE)
+
+_ASCII_UPPER = bytes.maketrans(b"abcdefghijklmnopqrstuvwxyz", b"ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+
+def _has_comma_from_list(sql: str) -> bool:
+    """True if the last FROM clause lists several comma-separated tables."""
+    if sql.isascii():
+        # Byte-level upper-casing via a translate table; SQL is nearly always ASCII
+        up = sql.encode("ascii").translate(_ASCII_UPPER)
+        from_, where, group, order, comma = b"FROM", b"WHERE", b"GROUP", b"ORDER", b","
+    else:
+        up = sql.upper()
+        from_, where, group, order, comma = "FROM", "WHERE", "GROUP", "ORDER", ","
+    if from_ not in up:
+        return False
+    tables = up.rpartition(from_)[2].split(where)[0].split(group)[0].split(order)[0]
+    return comma in tables
+
+
 def download_dataset(ds_config: Dict) -> Optional[List[Dict]]:
     """Download a single HuggingFace dataset and extract question/SQL pairs."""
     try:
@@ -191,9 +270,15 @@ def download_dataset(ds_config: Dict) -> Optional[List[Dict]]:
     q_col = ds_config["question_col"]
     s_col = ds_config["sql_col"]
 
-    for row in ds:
-        question = row.get(q_col, "")
-        sql = row.get(s_col, "")
+    missing = [c for c in (q_col, s_col) if c not in ds.column_names]
+    if missing:
+        logger.warning(f"  {name}: missing column(s) {missing}, skipping")
+        return pairs
+
+    # Pull just the two columns out of Arrow as lists instead of decoding
+    # every row into a dict of all columns.
+    ds = ds.select_columns([q_col, s_col])
+    for question, sql in zip(ds[q_col], ds[s_col]):
         if question and sql:
             pairs.append({
                 "question": str(question).strip(),
@@ -221,44 +306,64 @@ def evaluate_dataset(pairs: List[Dict], name: str) -> Dict:
         "avg_question_length": 0,
     }
 
-    sql_lengths = []
-    q_lengths = []
+    # Each row is reduced to a small bitmask of _SQL_FLAG_* bits and only the
+    # mask is counted; the per-flag totals are unpacked once at the end.
+    mask_counts = Counter()
+    single_table = multi_table = 0
+    sql_chars = 0
+    q_chars = 0
+    find_tokens = _SQL_TOKEN_RE.findall
+    match_select = _SELECT_RE.match
+    token_flags = _TOKEN_FLAGS
 
     for p in pairs:
-        sql_upper = p["sql"].upper().strip()
-        q = p["question"]
-
-        if sql_upper.startswith("SELECT"):
-            stats["select_only"] += 1
-        if any(agg in sql_upper for agg in ["SUM(", "AVG(", "COUNT(", "MAX(", "MIN("]):
-            stats["has_aggregate"] += 1
-        if "WHERE" in sql_upper:
-            stats["has_where"] += 1
-        if "GROUP BY" in sql_upper:
-            stats["has_group_by"] += 1
-        if "JOIN" in sql_upper:
-            stats["has_join"] += 1
-            stats["multi_table"] += 1
-        elif sql_upper.startswith("SELECT"):
-            # Count FROM clauses to detect multi-table
-            from_count = len(re.findall(r'\bFROM\b', sql_upper))
-            comma_tables = sql_upper.split("FROM")[-1].split("WHERE")[0] if "FROM" in sql_upper else ""
-            if "," in comma_tables.split("WHERE")[0].split("GROUP")[0].split("ORDER")[0]:
-                stats["multi_table"] += 1
+        sql = p["sql"]
+        mask = 0
+        for token in find_tokens(sql):
+            # Unicode case folding can match spellings that don't upper-case
+            # back to a key (e.g. "joİn"); those count for nothing
+            mask |= token_flags.get(token.upper(), 0)
+        if match_select(sql) is not None:
+            mask |= _SQL_FLAG_SELECT
+
+        if mask & _SQL_FLAG_JOIN:
+            multi_table += 1
+        elif mask & _SQL_FLAG_SELECT:
+            # Comma-separated FROM list → multi-table
+            if _has_comma_from_list(sql):
+                multi_table += 1
             else:
-                stats["single_table"] += 1
+                single_table += 1
+        mask_counts[mask] += 1
 
-        sql_lengths.append(len(p["sql"]))
-        q_lengths.append(len(q))
+        sql_chars += len(sql)
+        q_chars += len(p["question"])
 
-    if sql_lengths:
-        stats["avg_sql_length"] = sum(sql_lengths) / len(sql_lengths)
-    if q_lengths:
-        stats["avg_question_length"] = sum(q_lengths) / len(q_lengths)
+    for stat, flag in _SQL_FLAG_STATS:
+        stats[stat] = sum(n for mask, n in mask_counts.items() if mask & flag)
+    stats["single_table"] = single_table
+    stats["multi_table"] = multi_table
+    if pairs:
+        stats["avg_sql_length"] = sql_chars / len(pairs)
+        stats["avg_question_length"] = q_chars / len(pairs)
 
     return stats
 
 
+def adaptability_score(stats: Dict) -> float:
+    """0-100 score of how well a dataset's SQL maps onto our single-table schema."""
+    n = max(stats["total"], 1)
+    select_pct = stats["select_only"] / n
+    single_pct = stats["single_table"] / n
+    where_pct = stats["has_where"] / n
+    return (select_pct * 30 + single_pct * 30 + where_pct * 20 + min(stats["has_aggregate"]/n, 0.3)/0.3 * 20)
+
+
+def score_all(stats_list: List[Dict]) -> List[float]:
+    """Adaptability scores for many evaluate_dataset() results, in order."""
+    return [adaptability_score(stats) for stats in stats_list]
+
+
 def print_evaluation(stats: Dict):
     """Print evaluation report for a dataset."""
     n = max(stats["total"], 1)
@@ -275,11 +380,7 @@ def print_evaluation(stats: Dict):
     print(f"  Avg SQL length:    {stats['avg_sql_length']:.0f} chars")
     print(f"  Avg question len:  {stats['avg_question_length']:.0f} chars")
 
-    # Adaptability score
-    select_pct = stats["select_only"] / n
-    single_pct = stats["single_table"] / n
-    where_pct = stats["has_where"] / n
-    score = (select_pct * 30 + single_pct * 30 + where_pct * 20 + min(stats["has_aggregate"]/n, 0.3)/0.3 * 20)
+    score = adaptability_score(stats)
     print(f"  Adaptability:      {score:.0f}/100")
     print(f"{'='*55}")
 
@@ -326,12 +427,27 @@ INTENT_PATTERNS = {
     ],
 }
 
+# All INTENT_PATTERNS folded into one regex. Each intent is a zero-width
+# lookahead tried from the start of the question, in dict order, so the
+# first intent with any matching pattern wins (same priority as checking
+# the patterns one by one) and m.lastgroup names it.
+_INTENT_COMBINED = re.compile(
+    "|".join(
+        f"(?=(?s:.*?)(?:{'|'.join(pats)}))(?P<{intent}>)"
+        for intent, pats in INTENT_PATTERNS.items()
+    ),
+    re.IGNORECASE,
+)
+
+
+# Case-insensitive substring checks used by classify_intent() once the
+# aggregate patterns have missed
+_DISTINCT_OR_GROUP_BY_RE = re.compile(r"DISTINCT|GROUP BY", re.IGNORECASE)
+_GROUP_BY_RE = re.compile(r"GROUP BY", re.IGNORECASE)
+
 
 def classify_intent(question: str, sql: str) -> str:
     """Classify the intent of a question/SQL pair."""
-    q_lower = question.lower()
-    sql_upper = sql.upper()
-
     # Check SQL patterns first (more reliable)
     if AGG_PATTERNS["sum"].search(sql):
         return "sum"
@@ -339,244 +455,365 @@ def classify_intent(question: str, sql: str) -> str:
         return "average"
     if AGG_PATTERNS["count"].search(sql):
         return "count"
-    if "DISTINCT" in sql_upper and "GROUP BY" not in sql_upper:
+    m = _DISTINCT_OR_GROUP_BY_RE.search(sql)
+    if m:
+        # GROUP BY anywhere wins over DISTINCT
+        if m.group().upper() == "GROUP BY" or _GROUP_BY_RE.search(sql, m.end()):
+            return "compare"
         return "list_categories"
-    if "GROUP BY" in sql_upper:
-        return "compare"
 
     # Fall back to question patterns
-    for intent, patterns in INTENT_PATTERNS.items():
-        for pat in patterns:
-            if re.search(pat, q_lower):
-                return intent
+    m = _INTENT_COMBINED.match(question)
+    return m.lastgroup if m else "query_data"
 
-    return "query_data"
+
+# Cumulative table weights (in VALID_SOURCE_TABLES order), built once so
+# random.choices() skips its per-call cumsum. Numeric intents are weighted
+# towards Expenses/CashFlow.
+_CUM_WEIGHTS = {
+    "numeric": list(accumulate([0.40, 0.30, 0.0, 0.15, 0.15])),
+    "count": list(accumulate([0.30, 0.20, 0.15, 0.15, 0.20])),
+    "other": list(accumulate([0.35, 0.25, 0.15, 0.15, 0.10])),
+}
 
 
-def pick_source_table_for_intent(intent: str) -> Tuple[str, str]:
+def pick_source_table_for_intent(intent: str, rng=random) -> Tuple[str, str]:
     """Pick a source_table and document_type appropriate for the intent."""
     if intent == "list_files":
-        table = random.choice(VALID_SOURCE_TABLES)
+        table = rng.choice(VALID_SOURCE_TABLES)
         return table, "file"
 
-    # Weight towards Expenses/CashFlow for numeric intents
     if intent in ("sum", "average"):
-        weights = [0.40, 0.30, 0.0, 0.15, 0.15]
+        cum_weights = _CUM_WEIGHTS["numeric"]
     elif intent == "count":
-        weights = [0.30, 0.20, 0.15, 0.15, 0.20]
+        cum_weights = _CUM_WEIGHTS["count"]
     else:
-        weights = [0.35, 0.25, 0.15, 0.15, 0.10]
+        cum_weights = _CUM_WEIGHTS["other"]
 
-    table = random.choices(VALID_SOURCE_TABLES, weights=weights, k=1)[0]
+    table = rng.choices(VALID_SOURCE_TABLES, cum_weights=cum_weights, k=1)[0]
     return table, "row"
 
 
-def pick_metadata_key(source_table: str, need_numeric: bool = False) -> str:
+def pick_metadata_key(source_table: str, need_numeric: bool = False, rng=random) -> str:
     """Pick a metadata key for the given source table."""
-    keys = SCHEMA[source_table]
     if need_numeric:
-        numeric_in_table = [k for k in keys if k in NUMERIC_KEYS]
+        numeric_in_table = _NUM_BY_TABLE[source_table]
         if numeric_in_table:
-            return random.choice(numeric_in_table)
-    return random.choice(keys)
+            return rng.choice(numeric_in_table)
+    return rng.choice(SCHEMA[source_table])
+
+
+# Which ENTITY_POOLS entry supplies values for each (source_table, key);
+# None marks numeric keys.
+_ENTITY_POOL_MAP = {
+    ("Expenses", "Category"): "expense_categories",
+    ("Expenses", "Name"): "person_names",
+    ("CashFlow", "Type"): "cashflow_types",
+    ("CashFlow", "Category"): "cashflow_categories",
+    ("Project", "project_name"): "project_names",
+    ("Project", "client_name"): "client_names",
+    ("Project", "location"): "locations",
+    ("Project", "status"): "statuses_project",
+    ("Quotation", "quote_number"): "quote_numbers",
+    ("Quotation", "status"): "statuses_quotation",
+    ("Quotation", "total_amount"): None,  # numeric
+    ("Quotation", "project_name"): "project_names",
+    ("QuotationItem", "plate_no"): "plate_numbers",
+    ("QuotationItem", "dr_no"): "dr_numbers",
+    ("QuotationItem", "material"): "materials",
+    ("QuotationItem", "quarry_location"): "quarry_locations",
+    ("QuotationItem", "truck_type"): "truck_types",
+    ("QuotationItem", "volume"): None,  # numeric
+    ("QuotationItem", "line_total"): None,  # numeric
+}
 
+# (value, value.lower()) pairs per (source_table, key), so SQL filters can use
+# the lowercase form without re-lowering on every adapted pair.
+_ENTITY_VALUE_PAIRS = {
+    table_key: tuple((v, v.lower()) for v in ENTITY_POOLS[pool_name])
+    for table_key, pool_name in _ENTITY_POOL_MAP.items()
+    if pool_name and pool_name in ENTITY_POOLS
+}
+_PROJECT_NAMES_LOWER = tuple(v.lower() for v in ENTITY_POOLS["project_names"])
+_NUMERIC_VALUES = tuple(str(n) for n in (500, 1000, 2500, 5000, 10000, 25000, 50000))
 
-def pick_entity_value(source_table: str, key: str) -> str:
-    """Pick a realistic entity value for a given source_table + key."""
-    pool_map = {
-        ("Expenses", "Category"): "expense_categories",
-        ("Expenses", "Name"): "person_names",
-        ("CashFlow", "Type"): "cashflow_types",
-        ("CashFlow", "Category"): "cashflow_categories",
-        ("Project", "project_name"): "project_names",
-        ("Project", "client_name"): "client_names",
-        ("Project", "location"): "locations",
-        ("Project", "status"): "statuses_project",
-        ("Quotation", "quote_number"): "quote_numbers",
-        ("Quotation", "status"): "statuses_quotation",
-        ("Quotation", "total_amount"): None,  # numeric
-        ("Quotation", "project_name"): "project_names",
-        ("QuotationItem", "plate_no"): "plate_numbers",
-        ("QuotationItem", "dr_no"): "dr_numbers",
-        ("QuotationItem", "material"): "materials",
-        ("QuotationItem", "quarry_location"): "quarry_locations",
-        ("QuotationItem", "truck_type"): "truck_types",
-        ("QuotationItem", "volume"): None,  # numeric
-        ("QuotationItem", "line_total"): None,  # numeric
-    }
 
-    pool_name = pool_map.get((source_table, key))
-    if pool_name and pool_name in ENTITY_POOLS:
-        return random.choice(ENTITY_POOLS[pool_name])
+def pick_entity_value_pair(source_table: str, key: str, rng=random) -> Tuple[str, str]:
+    """Pick an entity value for source_table + key, plus its lowercase form."""
+    pool = _ENTITY_VALUE_PAIRS.get((source_table, key))
+    if pool:
+        return rng.choice(pool)
 
     # Numeric value
     if key in NUMERIC_KEYS:
-        return str(random.choice([500, 1000, 2500, 5000, 10000, 25000, 50000]))
+        val = rng.choice(_NUMERIC_VALUES)
+        return val, val
 
-    return "sample value"
+    return "sample value", "sample value"
 
 
-def adapt_pair(question: str, sql: str) -> Optional[Dict]:
-    """
-    Adapt a general text-to-SQL pair to AU-Ggregates format.
+def pick_entity_value(source_table: str, key: str, rng=random) -> str:
+    """Pick a realistic entity value for a given source_table + key."""
+    return pick_entity_value_pair(source_table, key, rng)[0]
 
-    This is the core adaptation logic. It:
-    1. Classifies the intent
-    2. Picks appropriate source_table + document_type
-    3. Generates a new SQL using our schema patterns
-    4. Rewrites the question to fit our domain
 
-    Returns None if the pair can't be meaningfully adapted.
-    """
-    intent = classify_intent(question, sql)
-    source_table, doc_type = pick_source_table_for_intent(intent)
+# SQL building blocks for adapt_pair(). Each adapted query is assembled as
+# a list of these pieces and joined once at the end.
+_LIST_FILES_SQL = (
+    "SELECT id, file_name, project_name FROM ai_documents "
+    "WHERE source_table = '{table}' AND document_type = 'file'"
+)
+_COUNT_SQL = (
+    "SELECT COUNT(*) AS count FROM ai_documents "
+    "WHERE source_table = '{table}' AND document_type = 'row'"
+)
+_SUM_SQL = (
+    "SELECT SUM((metadata->>'{num_key}')::numeric) AS total "
+    "FROM ai_documents "
+    "WHERE source_table = '{table}' AND document_type = 'row'"
+)
+_AVG_SQL = (
+    "SELECT AVG((metadata->>'{num_key}')::numeric) AS average "
+    "FROM ai_documents "
+    "WHERE source_table = '{table}' AND document_type = 'row'"
+)
+_QUERY_SQL = (
+    "SELECT {columns} FROM ai_documents "
+    "WHERE source_table = '{table}' AND document_type = 'row'"
+)
+_METADATA_FILTER = " AND metadata->>'{key}' ILIKE '%{val}%'"
+_PROJECT_FILTER = " AND project_name ILIKE '%{proj}%'"
 
-    # Build the adapted SQL
-    if intent == "list_files":
-        adapted_sql = (
-            f"SELECT id, file_name, project_name FROM ai_documents "
-            f"WHERE source_table = '{source_table}' AND document_type = 'file'"
-        )
-        # Maybe add project filter
-        if random.random() < 0.4:
-            proj = random.choice(ENTITY_POOLS["project_names"])
-            adapted_sql += f" AND project_name ILIKE '%{proj.lower()}%'"
-        adapted_sql += " ORDER BY file_name;"
+# Group-by keys that are real ai_documents columns rather than metadata keys
+_REGULAR_COLUMNS = frozenset({"project_name", "file_name", "source_table"})
 
-        adapted_q = _rewrite_question_list_files(question, source_table)
 
-    elif intent == "count":
-        key = pick_metadata_key(source_table)
-        val = pick_entity_value(source_table, key)
+def _adapt_list_files(question: str, source_table: str, rng) -> Tuple[str, str]:
+    """Build a list_files SQL + question."""
+    parts = [_LIST_FILES_SQL.format(table=source_table)]
+    # Maybe add project filter
+    if rng.random() < 0.4:
+        proj = rng.choice(_PROJECT_NAMES_LOWER)
+        parts.append(_PROJECT_FILTER.format(proj=proj))
+    parts.append(" ORDER BY file_name;")
+    adapted_sql = "".join(parts)
 
-        adapted_sql = (
-            f"SELECT COUNT(*) AS count FROM ai_documents "
-            f"WHERE source_table = '{source_table}' AND document_type = 'row'"
-        )
-        if key not in NUMERIC_KEYS and random.random() < 0.7:
-            adapted_sql += f" AND metadata->>'{key}' ILIKE '%{val.lower()}%'"
+    adapted_q = _rewrite_question_list_files(question, source_table, rng)
+    return adapted_sql, adapted_q
 
-        adapted_sql += ";"
-        adapted_q = _rewrite_question_count(question, source_table, key, val)
 
-    elif intent == "sum":
-        num_key = pick_metadata_key(source_table, need_numeric=True)
-        filter_key = pick_metadata_key(source_table, need_numeric=False)
-        filter_val = pick_entity_value(source_table, filter_key)
+def _adapt_count(question: str, source_table: str, rng) -> Tuple[str, str]:
+    """Build a COUNT SQL + question, optionally filtered on one key."""
+    key = pick_metadata_key(source_table, rng=rng)
+    val, val_lower = pick_entity_value_pair(source_table, key, rng)
 
-        adapted_sql = (
-            f"SELECT SUM((metadata->>'{num_key}')::numeric) AS total "
-            f"FROM ai_documents "
-            f"WHERE source_table = '{source_table}' AND document_type = 'row'"
-        )
-        if filter_key != num_key and filter_key not in NUMERIC_KEYS and random.random() < 0.6:
-            adapted_sql += f" AND metadata->>'{filter_key}' ILIKE '%{filter_val.lower()}%'"
+    parts = [_COUNT_SQL.format(table=source_table)]
+    if key not in NUMERIC_KEYS and rng.random() < 0.7:
+        parts.append(_METADATA_FILTER.format(key=key, val=val_lower))
 
-        # Maybe add project filter
-        if random.random() < 0.3:
-            proj = random.choice(ENTITY_POOLS["project_names"])
-            adapted_sql += f" AND project_name ILIKE '%{proj.lower()}%'"
+    parts.append(";")
+    adapted_sql = "".join(parts)
+    adapted_q = _rewrite_question_count(question, source_table, key, val, rng)
+    return adapted_sql, adapted_q
 
-        adapted_sql += ";"
-        adapted_q = _rewrite_question_sum(question, source_table, num_key, filter_key, filter_val)
 
-    elif intent == "average":
-        num_key = pick_metadata_key(source_table, need_numeric=True)
+def _adapt_sum(question: str, source_table: str, rng) -> Tuple[str, str]:
+    """Build a SUM SQL + question with optional key/project filters."""
+    num_key = pick_metadata_key(source_table, need_numeric=True, rng=rng)
+    filter_key = pick_metadata_key(source_table, need_numeric=False, rng=rng)
+    filter_val, filter_val_lower = pick_entity_value_pair(source_table, filter_key, rng)
 
-        adapted_sql = (
-            f"SELECT AVG((metadata->>'{num_key}')::numeric) AS average "
-            f"FROM ai_documents "
-            f"WHERE source_table = '{source_table}' AND document_type = 'row'"
-        )
-        if random.random() < 0.4:
-            filter_key = pick_metadata_key(source_table, need_numeric=False)
-            if filter_key != num_key and filter_key not in NUMERIC_KEYS:
-                filter_val = pick_entity_value(source_table, filter_key)
-                adapted_sql += f" AND metadata->>'{filter_key}' ILIKE '%{filter_val.lower()}%'"
+    parts = [_SUM_SQL.format(num_key=num_key, table=source_table)]
+    if filter_key != num_key and filter_key not in NUMERIC_KEYS and rng.random() < 0.6:
+        parts.append(_METADATA_FILTER.format(key=filter_key, val=filter_val_lower))
+
+    # Maybe add project filter
+    if rng.random() < 0.3:
+        proj = rng.choice(_PROJECT_NAMES_LOWER)
+        parts.append(_PROJECT_FILTER.format(proj=proj))
+
+    parts.append(";")
+    adapted_sql = "".join(parts)
+    adapted_q = _rewrite_question_sum(question, source_table, num_key, filter_key, filter_val, rng)
+    return adapted_sql, adapted_q
+
+
+def _adapt_average(question: str, source_table: str, rng) -> Tuple[str, str]:
+    """Build an AVG SQL + question with an optional key filter."""
+    num_key = pick_metadata_key(source_table, need_numeric=True, rng=rng)
+
+    parts = [_AVG_SQL.format(num_key=num_key, table=source_table)]
+    if rng.random() < 0.4:
+        filter_key = pick_metadata_key(source_table, need_numeric=False, rng=rng)
+        if filter_key != num_key and filter_key not in NUMERIC_KEYS:
+            _, filter_val_lower = pick_entity_value_pair(source_table, filter_key, rng)
+            parts.append(_METADATA_FILTER.format(key=filter_key, val=filter_val_lower))
 
-        adapted_sql += ";"
-        adapted_q = _rewrite_question_avg(question, source_table, num_key)
+    parts.append(";")
+    adapted_sql = "".join(parts)
+    adapted_q = _rewrite_question_avg(question, source_table, num_key, rng)
+    return adapted_sql, adapted_q
 
-    elif intent == "list_categories":
-        key = pick_metadata_key(source_table, need_numeric=False)
-        if key in NUMERIC_KEYS:
-            key = pick_metadata_key(source_table, need_numeric=False)
 
+def _adapt_list_categories(question: str, source_table: str, rng) -> Tuple[str, str]:
+    """Build a DISTINCT SQL + question for one non-numeric key."""
+    key = pick_metadata_key(source_table, need_numeric=False, rng=rng)
+    if key in NUMERIC_KEYS:
+        key = pick_metadata_key(source_table, need_numeric=False, rng=rng)
+
+    adapted_sql = (
+        f"SELECT DISTINCT metadata->>'{key}' AS {key.lower().replace(' ', '_')} "
+        f"FROM ai_documents "
+        f"WHERE source_table = '{source_table}' AND document_type = 'row' "
+        f"ORDER BY {key.lower().replace(' ', '_')};"
+    )
+    adapted_q = _rewrite_question_distinct(question, source_table, key, rng)
+    return adapted_sql, adapted_q
+
+
+def _adapt_compare(question: str, source_table: str, rng) -> Tuple[str, str]:
+    """Build a GROUP BY SQL + question comparing totals per key."""
+    num_key = pick_metadata_key(source_table, need_numeric=True, rng=rng)
+    group_key = pick_metadata_key(source_table, need_numeric=False, rng=rng)
+    if group_key == num_key or group_key in NUMERIC_KEYS:
+        # Pick a different non-numeric key
+        non_numeric = _NONNUM_BY_TABLE[source_table]
+        if non_numeric:
+            group_key = rng.choice(non_numeric)
+        else:
+            group_key = "project_name"  # fallback to regular column
+
+    if group_key in _REGULAR_COLUMNS:
+        # Regular column
         adapted_sql = (
-            f"SELECT DISTINCT metadata->>'{key}' AS {key.lower().replace(' ', '_')} "
+            f"SELECT {group_key}, SUM((metadata->>'{num_key}')::numeric) AS total "
             f"FROM ai_documents "
             f"WHERE source_table = '{source_table}' AND document_type = 'row' "
-            f"ORDER BY {key.lower().replace(' ', '_')};"
+            f"GROUP BY {group_key} ORDER BY total DESC;"
         )
-        adapted_q = _rewrite_question_distinct(question, source_table, key)
-
-    elif intent == "compare":
-        num_key = pick_metadata_key(source_table, need_numeric=True)
-        group_key = pick_metadata_key(source_table, need_numeric=False)
-        if group_key == num_key or group_key in NUMERIC_KEYS:
-            # Pick a different non-numeric key
-            non_numeric = [k for k in SCHEMA[source_table] if k not in NUMERIC_KEYS]
-            if non_numeric:
-                group_key = random.choice(non_numeric)
-            else:
-                group_key = "project_name"  # fallback to regular column
-
-        if group_key in ["project_name", "file_name", "source_table"]:
-            # Regular column
-            adapted_sql = (
-                f"SELECT {group_key}, SUM((metadata->>'{num_key}')::numeric) AS total "
-                f"FROM ai_documents "
-                f"WHERE source_table = '{source_table}' AND document_type = 'row' "
-                f"GROUP BY {group_key} ORDER BY total DESC;"
-            )
-        else:
-            adapted_sql = (
-                f"SELECT metadata->>'{group_key}' AS {group_key.lower()}, "
-                f"SUM((metadata->>'{num_key}')::numeric) AS total "
-                f"FROM ai_documents "
-                f"WHERE source_table = '{source_table}' AND document_type = 'row' "
-                f"GROUP BY {group_key.lower()} ORDER BY total DESC;"
-            )
-        adapted_q = _rewrite_question_compare(question, source_table, num_key, group_key)
-
-    else:  # query_data
-        keys = SCHEMA[source_table]
-        select_keys = random.sample(keys, min(random.randint(2, 4), len(keys)))
-        select_parts = []
-        for k in select_keys:
-            select_parts.append(f"metadata->>'{k}' AS {k.lower().replace(' ', '_')}")
-
+    else:
         adapted_sql = (
-            f"SELECT {', '.join(select_parts)} FROM ai_documents "
-            f"WHERE source_table = '{source_table}' AND document_type = 'row'"
+            f"SELECT metadata->>'{group_key}' AS {group_key.lower()}, "
+            f"SUM((metadata->>'{num_key}')::numeric) AS total "
+            f"FROM ai_documents "
+            f"WHERE source_table = '{source_table}' AND document_type = 'row' "
+            f"GROUP BY {group_key.lower()} ORDER BY total DESC;"
         )
+    adapted_q = _rewrite_question_compare(question, source_table, num_key, group_key, rng)
+    return adapted_sql, adapted_q
 
-        # Add 1-2 filters
-        filter_keys = [k for k in keys if k not in NUMERIC_KEYS]
-        if filter_keys and random.random() < 0.7:
-            fk = random.choice(filter_keys)
-            fv = pick_entity_value(source_table, fk)
-            adapted_sql += f" AND metadata->>'{fk}' ILIKE '%{fv.lower()}%'"
 
-        if random.random() < 0.3:
-            proj = random.choice(ENTITY_POOLS["project_names"])
-            adapted_sql += f" AND project_name ILIKE '%{proj.lower()}%'"
+def _adapt_query_data(question: str, source_table: str, rng) -> Tuple[str, str]:
+    """Build a metadata SELECT + question with optional filters."""
+    keys = SCHEMA[source_table]
+    select_keys = rng.sample(keys, min(rng.randint(2, 4), len(keys)))
+    select_parts = []
+    for k in select_keys:
+        select_parts.append(f"metadata->>'{k}' AS {k.lower().replace(' ', '_')}")
+
+    parts = [_QUERY_SQL.format(columns=", ".join(select_parts), table=source_table)]
+
+    # Add 1-2 filters
+    filter_keys = _NONNUM_BY_TABLE[source_table]
+    if filter_keys and rng.random() < 0.7:
+        fk = rng.choice(filter_keys)
+        _, fv_lower = pick_entity_value_pair(source_table, fk, rng)
+        parts.append(_METADATA_FILTER.format(key=fk, val=fv_lower))
+
+    if rng.random() < 0.3:
+        proj = rng.choice(_PROJECT_NAMES_LOWER)
+        parts.append(_PROJECT_FILTER.format(proj=proj))
+
+    parts.append(" LIMIT 25;")
+    adapted_sql = "".join(parts)
+    adapted_q = _rewrite_question_query(question, source_table, select_keys, rng)
+    return adapted_sql, adapted_q
+
+
+# One SQL/question builder per intent; anything unrecognised is query_data.
+_INTENT_BUILDERS = {
+    "list_files": _adapt_list_files,
+    "count": _adapt_count,
+    "sum": _adapt_sum,
+    "average": _adapt_average,
+    "list_categories": _adapt_list_categories,
+    "compare": _adapt_compare,
+}
 
-        adapted_sql += " LIMIT 25;"
-        adapted_q = _rewrite_question_query(question, source_table, select_keys)
 
-    # Build final pair
+def adapt_pair(question: str, sql: str, rng=random) -> Optional[Dict]:
+    """
+    Adapt a general text-to-SQL pair to AU-Ggregates format.
+
+    This is the core adaptation logic. It:
+    1. Classifies the intent
+    2. Picks appropriate source_table + document_type
+    3. Generates a new SQL using our schema patterns
+    4. Rewrites the question to fit our domain
+
+    All randomness is drawn from ``rng`` (the ``random`` module by default,
+    or a seeded ``random.Random``) so a batch can use its own generator.
+
+    Returns None if the pair can't be meaningfully adapted.
+    """
+    intent = classify_intent(question, sql)
+    source_table, doc_type = pick_source_table_for_intent(intent, rng)
+
+    # Build the adapted SQL + question
+    build = _INTENT_BUILDERS.get(intent, _adapt_query_data)
+    adapted_sql, adapted_q = build(question, source_table, rng)
+
+    # Build final pair. A two-operand + is already a single allocation (same
+    # as "".join), and consumers expect the prefix inline in "input".
     adapted_input = SPIDER_PREFIX + adapted_q
     return {"input": adapted_input, "target": adapted_sql}
 
 
+def _adapt_chunk(job: Tuple[List[Tuple[str, str]], int]) -> List[Dict]:
+    """Adapt one chunk of (question, sql) pairs with its own seeded RNG."""
+    chunk, seed = job
+    rng = random.Random(seed)
+    adapted = []
+    for question, sql in chunk:
+        pair = adapt_pair(question, sql, rng)
+        if pair is not None:
+            adapted.append(pair)
+    return adapted
+
+
+def adapt_many(pairs: List[Tuple[str, str]], workers: Optional[int] = None,
+               seed: int = 42, chunk_size: int = 10000) -> List[Dict]:
+    """
+    Adapt many (question, sql) pairs across a process pool.
+
+    Pairs are split into chunks of ``chunk_size`` and each chunk gets its own
+    RNG seed derived from ``seed``, so the output depends only on the input
+    and seed, not on the number of workers. ``workers=None`` uses all CPUs;
+    ``workers=1`` runs in-process.
+    """
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    seed_rng = random.Random(seed)
+    jobs = [(chunk, seed_rng.getrandbits(64)) for chunk in chunks]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        results = list(map(_adapt_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_adapt_chunk, jobs))
+
+    adapted = []
+    for chunk_result in results:
+        adapted.extend(chunk_result)
+    return adapted
+
 
 # ============================================================================
 # QUESTION REWRITING — make questions sound natural for our domain
 # ============================================================================
 
-# Phrasing templates per intent
-_LIST_FILES_TEMPLATES = [
+# Phrasing templates per intent (immutable; one rng.choice per rewrite)
+_LIST_FILES_TEMPLATES = (
     "show all {table} files",
     "list {table} documents",
     "what {table} files are available",
@@ -587,9 +824,9 @@ _LIST_FILES_TEMPLATES = [
     "pull up {table} files",
     "retrieve {table} file list",
     "find all {table} documents",
-]
+)
 
-_COUNT_TEMPLATES = [
+_COUNT_TEMPLATES = (
     "how many {table} entries have {key} as {val}",
     "count {table} records where {key} is {val}",
     "how many {table} rows with {key} {val}",
@@ -597,9 +834,9 @@ _COUNT_TEMPLATES = [
     "count of {val} in {table}",
     "how many {val} records in {table}",
     "number of {table} entries with {val} {key}",
-]
+)
 
-_SUM_TEMPLATES = [
+_SUM_TEMPLATES = (
     "total {num_key} for {table}",
     "what is the total {num_key} in {table}",
     "how much {num_key} for {filter_val} in {table}",
@@ -609,34 +846,34 @@ _SUM_TEMPLATES = [
     "give me the total {table} {num_key}",
     "what's the sum of {num_key} for {filter_val}",
     "total {table} {num_key} for {filter_val}",
-]
+)
 
-_AVG_TEMPLATES = [
+_AVG_TEMPLATES = (
     "average {num_key} for {table}",
     "what is the average {num_key} in {table}",
     "mean {num_key} across {table} records",
     "avg {table} {num_key}",
     "what's the average {num_key} for {table}",
-]
+)
 
-_DISTINCT_TEMPLATES = [
+_DISTINCT_TEMPLATES = (
     "list all {key} values in {table}",
     "what are the distinct {key} in {table}",
     "show unique {key} for {table}",
     "what {key} types exist in {table}",
     "list all unique {key} in {table} records",
     "get distinct {key} from {table}",
-]
+)
 
-_COMPARE_TEMPLATES = [
+_COMPARE_TEMPLATES = (
     "compare {num_key} by {group_key} in {table}",
     "breakdown of {num_key} per {group_key} for {table}",
     "{table} {num_key} grouped by {group_key}",
     "show {num_key} by {group_key} in {table}",
     "total {num_key} per {group_key} for {table}",
-]
+)
 
-_QUERY_TEMPLATES = [
+_QUERY_TEMPLATES = (
     "show {table} data for {keys}",
     "get {table} records with {keys}",
     "display {table} {keys}",
@@ -645,88 +882,103 @@ _QUERY_TEMPLATES = [
     "find {table} entries showing {keys}",
     "what are the {keys} in {table}",
     "show me {table} {keys}",
-]
+)
+
+
+# Natural-language variants per source_table; one is drawn per question
+_FRIENDLY_TABLE_OPTIONS = {
+    "Expenses": ("expense", "expenses", "cost"),
+    "CashFlow": ("cash flow", "cashflow", "cash"),
+    "Project": ("project", "projects"),
+    "Quotation": ("quotation", "quote"),
+    "QuotationItem": ("delivery", "deliveries", "line item"),
+}
+
+_FRIENDLY_KEYS = {
+    "Expenses": "amount",
+    "Amount": "amount",
+    "total_amount": "total amount",
+    "volume": "volume",
+    "line_total": "line total",
+    "Category": "category",
+    "Name": "name",
+    "Type": "type",
+    "project_name": "project name",
+    "client_name": "client",
+    "location": "location",
+    "status": "status",
+    "quote_number": "quote number",
+    "plate_no": "plate number",
+    "dr_no": "DR number",
+    "material": "material",
+    "quarry_location": "quarry",
+    "truck_type": "truck type",
+}
+# Memoized _friendly_key() results, including the fallback for unmapped keys
+_FRIENDLY_KEY_CACHE: Dict[str, str] = dict(_FRIENDLY_KEYS)
 
 
-def _friendly_table(table: str) -> str:
+def _friendly_table(table: str, rng=random) -> str:
     """Make source_table name more natural in questions."""
-    mapping = {
-        "Expenses": random.choice(["expense", "expenses", "cost"]),
-        "CashFlow": random.choice(["cash flow", "cashflow", "cash"]),
-        "Project": random.choice(["project", "projects"]),
-        "Quotation": random.choice(["quotation", "quote"]),
-        "QuotationItem": random.choice(["delivery", "deliveries", "line item"]),
-    }
-    return mapping.get(table, table.lower())
+    options = _FRIENDLY_TABLE_OPTIONS.get(table)
+    if options is None:
+        return table.lower()
+    return rng.choice(options)
 
 
 def _friendly_key(key: str) -> str:
     """Make metadata key name more natural."""
-    mapping = {
-        "Expenses": "amount",
-        "Amount": "amount",
-        "total_amount": "total amount",
-        "volume": "volume",
-        "line_total": "line total",
-        "Category": "category",
-        "Name": "name",
-        "Type": "type",
-        "project_name": "project name",
-        "client_name": "client",
-        "location": "location",
-        "status": "status",
-        "quote_number": "quote number",
-        "plate_no": "plate number",
-        "dr_no": "DR number",
-        "material": "material",
-        "quarry_location": "quarry",
-        "truck_type": "truck type",
-    }
-    return mapping.get(key, key.lower().replace("_", " "))
+    friendly = _FRIENDLY_KEY_CACHE.get(key)
+    if friendly is None:
+        friendly = key.lower().replace("_", " ")
+        _FRIENDLY_KEY_CACHE[key] = friendly
+    return friendly
 
 
-def _rewrite_question_list_files(orig: str, table: str) -> str:
-    t = random.choice(_LIST_FILES_TEMPLATES)
-    return t.format(table=_friendly_table(table))
+def _rewrite_question_list_files(orig: str, table: str, rng=random) -> str:
+    t = rng.choice(_LIST_FILES_TEMPLATES)
+    return t.format(table=_friendly_table(table, rng))
 
 
-def _rewrite_question_count(orig: str, table: str, key: str, val: str) -> str:
-    t = random.choice(_COUNT_TEMPLATES)
-    return t.format(table=_friendly_table(table), key=_friendly_key(key), val=val)
+def _rewrite_question_count(orig: str, table: str, key: str, val: str,
+                            rng=random) -> str:
+    t = rng.choice(_COUNT_TEMPLATES)
+    return t.format(table=_friendly_table(table, rng), key=_friendly_key(key), val=val)
 
 
 def _rewrite_question_sum(orig: str, table: str, num_key: str,
-                          filter_key: str, filter_val: str) -> str:
-    t = random.choice(_SUM_TEMPLATES)
+                          filter_key: str, filter_val: str, rng=random) -> str:
+    t = rng.choice(_SUM_TEMPLATES)
     return t.format(
-        table=_friendly_table(table),
+        table=_friendly_table(table, rng),
         num_key=_friendly_key(num_key),
         filter_key=_friendly_key(filter_key),
         filter_val=filter_val,
     )
 
 
-def _rewrite_question_avg(orig: str, table: str, num_key: str) -> str:
-    t = random.choice(_AVG_TEMPLATES)
-    return t.format(table=_friendly_table(table), num_key=_friendly_key(num_key))
+def _rewrite_question_avg(orig: str, table: str, num_key: str, rng=random) -> str:
+    t = rng.choice(_AVG_TEMPLATES)
+    return t.format(table=_friendly_table(table, rng), num_key=_friendly_key(num_key))
 
 
-def _rewrite_question_distinct(orig: str, table: str, key: str) -> str:
-    t = random.choice(_DISTINCT_TEMPLATES)
-    return t.format(table=_friendly_table(table), key=_friendly_key(key))
+def _rewrite_question_distinct(orig: str, table: str, key: str, rng=random) -> str:
+    t = rng.choice(_DISTINCT_TEMPLATES)
+    return t.format(table=_friendly_table(table, rng), key=_friendly_key(key))
 
 
-def _rewrite_question_compare(orig: str, table: str, num_key: str, group_key: str) -> str:
-    t = random.choice(_COMPARE_TEMPLATES)
+def _rewrite_question_compare(orig: str, table: str, num_key: str, group_key: str,
+                              rng=random) -> str:
+    t = rng.choice(_COMPARE_TEMPLATES)
     return t.format(
-        table=_friendly_table(table),
+        table=_friendly_table(table, rng),
         num_key=_friendly_key(num_key),
         group_key=_friendly_key(group_key),
     )
 
 
-def _rewrite_question_query(orig: str, table: str, keys: List[str]) -> str:
-    t = random.choice(_QUERY_TEMPLATES)
+def _rewrite_question_query(orig: str, table: str, keys: List[str], rng=random) -> str:
+    t = rng.choice(_QUERY_TEMPLATES)
     friendly_keys = ", ".join(_friendly_key(k) for k in keys[:3])
-    return t.format(table=_friendly_table(table), keys=friendly_keys)
+    return t.format(table=_friendly_table(table, rng), keys=friendly_keys)
 
@@ -15,97 +15,241 @@ Schema Reference (from SchemaRegistry GLOBAL_SCHEMA):
 
 Numeric keys (need ::numeric casting): Expenses, Amount, total_amount, volume, line_total
 
+SQL is parameterised: $1 is org_id, and any user values ($2, $3, …) are
+listed in the output's "sql_params" array.
+
 Usage:
     python scripts/generate_training_data.py
     python scripts/generate_training_data.py --output data/training.jsonl --count 3000
+    python scripts/generate_training_data.py --cache-dir data/.cache
 """
 
+import calendar
+import hashlib
 import json
+import os
 import random
+import shutil
+import sys
 import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from itertools import chain, islice, product
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Prebuilt encoder. json.dumps() re-checks its keyword arguments on every
+# call; binding one encoder's .encode skips that. The output is identical
+# to json.dumps'. The default ensure_ascii=True is kept for the JSONL lines
+# too: the vocabularies are all ASCII, and the C encoder's ASCII path is
+# its fastest.
+_dumps = json.JSONEncoder().encode
+
+# Generators yield (instruction, output JSON) pairs; the example dicts of
+# generate_all_examples() and the JSONL lines are both built from them.
+# Generated examples never carry an "input".
+Pair = Tuple[str, str]
+
+
+def _emit_line(instruction: str, output: str) -> str:
+    """
+    Serialise one example as a JSONL line, byte-identical to
+    ``json.dumps(example) + "\n"``: the two strings are encoded directly
+    into the fixed line layout, with no example dict in between.
+    """
+    return '{"instruction": ' + _dumps(instruction) + ', "input": "", "output": ' + _dumps(output) + "}\n"
+
+
+def _emit_nested_line(instruction: str, output: str) -> str:
+    """
+    Like ``_emit_line`` but with ``output`` as a nested JSON object. The
+    output string is already JSON text, so it is spliced in as-is instead
+    of being escaped a second time.
+    """
+    return '{"instruction": ' + _dumps(instruction) + ', "input": "", "output": ' + output + "}\n"
+
+
+def _interned(values: List[str]) -> List[str]:
+    """Intern a fixed vocabulary: its strings recur across many examples."""
+    return [sys.intern(v) for v in values]
+
 
 # ============================================================================
 # REAL DATA FROM PRODUCTION (pulled directly from Supabase)
 # ============================================================================
 
 # Real file names from ai_documents.file_name
-FILE_NAMES = [
+FILE_NAMES = _interned([
     "francis gays", "jc", "jash gay", "TEST",
     "QUO-2026-0001", "QUO-2026-0002", "QUO-2026-0003",
     "QUO-2026-0004", "QUO-2026-0005", "QUO-2026-0006",
-]
+])
 
 # Real project names from ai_documents.project_name
-PROJECTS = ["TEST", "STI construction", "Natours-official", "Auggregates-db"]
+PROJECTS = _interned(["TEST", "STI construction", "Natours-official", "Auggregates-db"])
 
 # Real source tables in ai_documents
-SOURCE_TABLES = ["Expenses", "CashFlow", "Project", "Quotation", "QuotationItem"]
+SOURCE_TABLES = _interned(["Expenses", "CashFlow", "Project", "Quotation", "QuotationItem"])
 
 # Real metadata keys found in Expenses rows: Category, Expenses, Name
 # Real metadata keys found in CashFlow rows: Type, Amount, Category
 # Real metadata keys found in Project rows: project_name, client_name, location, status
 # Real metadata keys found in Quotation rows: quote_number, status, total_amount, project_name
 # Real metadata keys found in QuotationItem rows: plate_no, dr_no, material, quarry_location, truck_type, volume, line_total
-EXPENSE_CATEGORIES = ["fuel", "food", "car"]       # from real data
-CASHFLOW_CATEGORIES = ["car"]                       # from real data
-ALL_CATEGORIES = ["fuel", "food", "car", "labor", "cement", "steel", "sand", "gravel"]
+EXPENSE_CATEGORIES = _interned(["fuel", "food", "car"])       # from real data
+CASHFLOW_CATEGORIES = _interned(["car"])                       # from real data
+ALL_CATEGORIES = _interned(["fuel", "food", "car", "labor", "cement", "steel", "sand", "gravel"])
 
 # Real quotation numbers
-QUOTATION_NUMBERS = [
+QUOTATION_NUMBERS = _interned([
     "QUO-2026-0001", "QUO-2026-0002", "QUO-2026-0003",
     "QUO-2026-0004", "QUO-2026-0005", "QUO-2026-0006",
-]
+])
 
 # Real materials from QuotationItem
-MATERIALS = ["Washed Sand", "Gravel", "Crushed Stone", "Fill Soil"]
+MATERIALS = _interned(["Washed Sand", "Gravel", "Crushed Stone", "Fill Soil"])
 
 # Real statuses for Projects and Quotations
-PROJECT_STATUSES = ["active", "completed", "pending", "on hold"]
-QUOTATION_STATUSES = ["draft", "sent", "approved", "rejected"]
+PROJECT_STATUSES = _interned(["active", "completed", "pending", "on hold"])
+QUOTATION_STATUSES = _interned(["draft", "sent", "approved", "rejected"])
 
 # Real locations
-LOCATIONS = ["Manila", "Quezon City", "Makati", "Cebu", "Davao"]
+LOCATIONS = _interned(["Manila", "Quezon City", "Makati", "Cebu", "Davao"])
 
 # Real client names
-CLIENT_NAMES = ["STI construction", "ABC Corp", "XYZ Builders", "Metro Contractors"]
+CLIENT_NAMES = _interned(["STI construction", "ABC Corp", "XYZ Builders", "Metro Contractors"])
 
 # Real plate numbers
-PLATE_NUMBERS = ["ABC-123", "XYZ-456", "DEF-789", "GHI-012"]
+PLATE_NUMBERS = _interned(["ABC-123", "XYZ-456", "DEF-789", "GHI-012"])
 
 # Real DR numbers
-DR_NUMBERS = ["DR-001", "DR-002", "DR-003", "DR-004", "DR-005"]
+DR_NUMBERS = _interned(["DR-001", "DR-002", "DR-003", "DR-004", "DR-005"])
 
 # Real truck types
-TRUCK_TYPES = ["6-wheeler", "10-wheeler", "dump truck", "trailer"]
+TRUCK_TYPES = _interned(["6-wheeler", "10-wheeler", "dump truck", "trailer"])
 
 # Real quarry locations
-QUARRY_LOCATIONS = ["Montalban", "Teresa", "Angono", "San Mateo"]
+QUARRY_LOCATIONS = _interned(["Montalban", "Teresa", "Angono", "San Mateo"])
 
 # ============================================================================
 # ENGLISH VERB VARIATIONS
 # ============================================================================
-SHOW_VERBS = [
+SHOW_VERBS = _interned([
     "show", "display", "get", "retrieve", "open", "view",
     "show me", "get me", "let me see", "pull up", "bring up"
-]
-FIND_VERBS = [
+])
+FIND_VERBS = _interned([
     "find", "search", "look for", "search for", "locate",
-    "find me", "search for", "look up", "get"
-]
-COUNT_VERBS = [
+    "find me", "look up", "get"
+])
+COUNT_VERBS = _interned([
     "count", "count all", "how many", "give me the count of",
     "tell me how many", "what is the count of", "count the number of"
-]
-COMPARE_VERBS = [
+])
+COMPARE_VERBS = _interned([
     "compare", "compare the expenses between", "show the difference between",
     "what is the difference between", "contrast", "compare expenses for"
-]
-LIST_VERBS = [
+])
+LIST_VERBS = _interned([
     "list", "list all", "show all", "get all", "what are the",
     "give me all", "display all", "enumerate"
-]
+])
+
+# Find + show verbs without the overlap ("get", "search for"), in order
+_FIND_OR_SHOW_VERBS = tuple(dict.fromkeys(FIND_VERBS + SHOW_VERBS))
+
+
+# ============================================================================
+# SQL TEMPLATES
+# Every query is parameterised: $1 is always org_id and user values bind
+# to $2, $3, … from the example's "sql_params". Callers run
+# cursor.execute(sql, [org_id, *sql_params]), so each intent maps to one
+# SQL text and one cached plan.
+#
+# File names match by anchored prefix on lower(file_name) (param "name%",
+# with any \, % and _ in the name escaped under ESCAPE '\' so "dr_no" does
+# not also match "drxno"), which a btree can serve, unlike a leading-wildcard
+# ILIKE:
+#   CREATE INDEX ai_documents_filename_lower ON ai_documents (lower(file_name) text_pattern_ops);
+# Categories come from a closed set, so they match by case-insensitive
+# equality rather than a substring scan. File comparisons run one
+# file_name equality probe per file under UNION ALL (each an index scan)
+# and aggregate the pair in an outer GROUP BY. Free-text values are
+# contains-searches, so they use strpos(lower(col), lower($n)) > 0 with the
+# plain value as the param, rather than ILIKE '%value%' (no wildcards to
+# build or escape, and a direct substring search instead of LIKE matching).
+# ============================================================================
+# Column lists shared by the Project, Quotation and QuotationItem lookups
+_PROJECT_SELECT = "SELECT metadata->>'project_name' as project_name, metadata->>'client_name' as client_name, metadata->>'location' as location, metadata->>'status' as status FROM ai_documents"
+_QUOTATION_SELECT = "SELECT metadata->>'quote_number' as quote_number, metadata->>'status' as status, metadata->>'total_amount' as total_amount, metadata->>'project_name' as project_name FROM ai_documents"
+_QUOTATION_ITEM_SELECT = "SELECT metadata->>'plate_no' as plate_no, metadata->>'dr_no' as dr_no, metadata->>'material' as material, metadata->>'volume' as volume, metadata->>'line_total' as line_total FROM ai_documents"
+
+# One SQL text per intent, shared by every generator ("filter_by_month" is
+# the month-range form of "filter_by_date").
+_SQL: Dict[str, str] = {
+    "get_file_summary": "SELECT file_name, metadata->>'description' as description, metadata->>'project_name' as project FROM ai_documents WHERE lower(file_name) LIKE $2 ESCAPE '\\' AND document_type = 'file' AND org_id = $1 LIMIT 1;",
+    "find_category": "SELECT file_name, COUNT(*) as count FROM ai_documents WHERE lower(metadata->>'Category') = lower($2) AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 GROUP BY file_name;",
+    "find_category_in_file": "SELECT * FROM ai_documents WHERE lower(metadata->>'Category') = lower($2) AND lower(file_name) LIKE $3 ESCAPE '\\' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;",
+    "count_with_date_filter": "SELECT COUNT(*) as count FROM ai_documents WHERE user_date >= $2 AND user_date <= $3 AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;",
+    "filter_by_month": "SELECT * FROM ai_documents WHERE user_date >= $2 AND user_date <= $3 AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;",
+    "find_by_date_and_name": "SELECT * FROM ai_documents WHERE strpos(lower(metadata->>'Name'), lower($2)) > 0 AND user_date = $3 AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;",
+    "filter_by_date": "SELECT * FROM ai_documents WHERE user_date = $2 AND document_type = 'row' AND org_id = $1;",
+    "list_categories": "SELECT DISTINCT metadata->>'Category' as category FROM ai_documents WHERE metadata->>'Category' IS NOT NULL AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 ORDER BY category;",
+    "list_categories_in_file": "SELECT DISTINCT metadata->>'Category' as category FROM ai_documents WHERE metadata->>'Category' IS NOT NULL AND lower(file_name) LIKE $2 ESCAPE '\\' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 ORDER BY category;",
+    "compare_expenses": "SELECT file_name, COUNT(*) as item_count, SUM(expenses) as total_amount FROM ("
+        "SELECT file_name, (metadata->>'Expenses')::numeric as expenses FROM ai_documents WHERE file_name = $2 AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1"
+        " UNION ALL "
+        "SELECT file_name, (metadata->>'Expenses')::numeric as expenses FROM ai_documents WHERE file_name = $3 AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1"
+        ") AS pair GROUP BY file_name;",
+    "compare_category_between_files": "SELECT file_name, COUNT(*) as count, SUM(expenses) as total FROM ("
+        "SELECT file_name, (metadata->>'Expenses')::numeric as expenses FROM ai_documents WHERE file_name = $3 AND lower(metadata->>'Category') = lower($2) AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1"
+        " UNION ALL "
+        "SELECT file_name, (metadata->>'Expenses')::numeric as expenses FROM ai_documents WHERE file_name = $4 AND lower(metadata->>'Category') = lower($2) AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1"
+        ") AS pair GROUP BY file_name;",
+    "fuzzy_file_lookup": "SELECT file_name, metadata->>'description' as description, similarity(file_name, $2) as sim FROM ai_documents WHERE file_name % $2 AND document_type = 'file' AND org_id = $1 ORDER BY sim DESC LIMIT 5;",
+    "sum_expenses": "SELECT SUM((metadata->>'Expenses')::numeric) as total FROM ai_documents WHERE lower(file_name) LIKE $2 ESCAPE '\\' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;",
+    "sum_by_category": "SELECT SUM((metadata->>'Expenses')::numeric) as total FROM ai_documents WHERE lower(metadata->>'Category') = lower($2) AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;",
+    "sum_cashflow": "SELECT SUM((metadata->>'Amount')::numeric) as total FROM ai_documents WHERE source_table = 'CashFlow' AND document_type = 'row' AND org_id = $1;",
+    "sum_cashflow_by_type": "SELECT SUM((metadata->>'Amount')::numeric) as total FROM ai_documents WHERE strpos(lower(metadata->>'Type'), lower($2)) > 0 AND source_table = 'CashFlow' AND document_type = 'row' AND org_id = $1;",
+    "clarification_response": "SELECT * FROM ai_documents WHERE strpos(lower(searchable_text), lower($2)) > 0 AND lower(file_name) LIKE $3 ESCAPE '\\' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;",
+    "clarification_response_numeric": "SELECT * FROM ai_documents WHERE lower(file_name) LIKE $2 ESCAPE '\\' AND document_type = 'row' AND org_id = $1;",
+    "list_projects": f"{_PROJECT_SELECT} WHERE source_table = 'Project' AND document_type = 'row' AND org_id = $1;",
+    "query_project": f"{_PROJECT_SELECT} WHERE strpos(lower(metadata->>'project_name'), lower($2)) > 0 AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;",
+    "query_project_by_client": f"{_PROJECT_SELECT} WHERE strpos(lower(metadata->>'client_name'), lower($2)) > 0 AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;",
+    "query_project_by_location": f"{_PROJECT_SELECT} WHERE strpos(lower(metadata->>'location'), lower($2)) > 0 AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;",
+    "query_project_by_status": f"{_PROJECT_SELECT} WHERE strpos(lower(metadata->>'status'), lower($2)) > 0 AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;",
+    "count_projects": "SELECT COUNT(*) as count FROM ai_documents WHERE source_table = 'Project' AND document_type = 'row' AND org_id = $1;",
+    "list_quotations": f"{_QUOTATION_SELECT} WHERE source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;",
+    "query_quotation": f"{_QUOTATION_SELECT} WHERE strpos(lower(metadata->>'quote_number'), lower($2)) > 0 AND source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;",
+    "query_quotation_by_status": f"{_QUOTATION_SELECT} WHERE strpos(lower(metadata->>'status'), lower($2)) > 0 AND source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;",
+    "query_quotation_by_project": f"{_QUOTATION_SELECT} WHERE strpos(lower(metadata->>'project_name'), lower($2)) > 0 AND source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;",
+    "sum_quotation_amount": "SELECT SUM((metadata->>'total_amount')::numeric) as total FROM ai_documents WHERE source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;",
+    "count_quotations": "SELECT COUNT(*) as count FROM ai_documents WHERE source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;",
+    "list_quotation_items": "SELECT metadata->>'plate_no' as plate_no, metadata->>'dr_no' as dr_no, metadata->>'material' as material, metadata->>'quarry_location' as quarry_location, metadata->>'truck_type' as truck_type, metadata->>'volume' as volume, metadata->>'line_total' as line_total FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+    "query_by_plate": f"{_QUOTATION_ITEM_SELECT} WHERE strpos(lower(metadata->>'plate_no'), lower($2)) > 0 AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+    "query_by_dr": f"{_QUOTATION_ITEM_SELECT} WHERE strpos(lower(metadata->>'dr_no'), lower($2)) > 0 AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+    "query_by_material": f"{_QUOTATION_ITEM_SELECT} WHERE strpos(lower(metadata->>'material'), lower($2)) > 0 AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+    "sum_volume": "SELECT SUM((metadata->>'volume')::numeric) as total_volume FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+    "sum_line_total": "SELECT SUM((metadata->>'line_total')::numeric) as total FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+    "sum_volume_by_material": "SELECT SUM((metadata->>'volume')::numeric) as total_volume FROM ai_documents WHERE strpos(lower(metadata->>'material'), lower($2)) > 0 AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+    "count_deliveries": "SELECT COUNT(*) as count FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;",
+}
+
+
+def _like_prefix(value: str) -> str:
+    """Anchored LIKE pattern for *value*, its metacharacters escaped with \\."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+# lower(file_name) LIKE prefix parameter per file, built once at import
+_FILE_PREFIX = {file: _like_prefix(file.lower()) for file in FILE_NAMES}
+
+# Slots of the whole-table queries (list/count/sum), shared rather than
+# rebuilt per intent; outputs are serialised straight away, never mutated
+_TABLE_SLOTS = {table: {"source_table": table} for table in SOURCE_TABLES}
 
 
 # ============================================================================
@@ -113,117 +257,99 @@ LIST_VERBS = [
 # "show francis gays" → should return ONLY the file summary (1 result)
 # NOT all child rows
 # ============================================================================
-def gen_file_level_queries() -> List[Dict]:
-    examples = []
+def gen_file_level_queries() -> Iterator[Pair]:
+    dumps = _dumps
+
     # Real schema: document_type='file' rows have metadata: {type, file_name, description, project_name}
-    sql_template = "SELECT file_name, metadata->>'description' as description, metadata->>'project_name' as project FROM ai_documents WHERE file_name ILIKE '%{file}%' AND document_type = 'file' LIMIT 1;"
+    sql = _SQL["get_file_summary"]
+    phrasings = tuple(f"{verb} {{file}}" for verb in SHOW_VERBS) + (
+        "open the {file} file",
+        "what is in {file}",
+        "give me the summary of {file}",
+        "show the {file} expense file",
+        "I want to see {file}",
+        "show details for {file}",
+    )
     for file in FILE_NAMES:
-        for verb in SHOW_VERBS:
-            examples.append({
-                "instruction": f"{verb} {file}",
-                "input": "",
-                "output": json.dumps({
-                    "intent": "get_file_summary",
-                    "scope": "file",
-                    "slots": {"file_name": file},
-                    "needs_clarification": False,
-                    "sql": sql_template.format(file=file)
-                })
-            })
-        extras = [
-            f"open the {file} file",
-            f"what is in {file}",
-            f"give me the summary of {file}",
-            f"show the {file} expense file",
-            f"I want to see {file}",
-            f"pull up {file}",
-            f"show details for {file}",
-        ]
-        for phrase in extras:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "get_file_summary",
-                    "scope": "file",
-                    "slots": {"file_name": file},
-                    "needs_clarification": False,
-                    "sql": sql_template.format(file=file)
-                })
-            })
-    return examples
+        output = {
+            "intent": "get_file_summary",
+            "scope": "file",
+            "slots": {"file_name": file},
+            "needs_clarification": False,
+            "sql": sql,
+            "sql_params": [_FILE_PREFIX[file]]
+        }
+        out = dumps(output)
+        ctx = {"file": file}
+        for template in phrasings:
+            yield template.format_map(ctx), out
 
 
 # ============================================================================
 # BUG #2: AMBIGUOUS QUERY → needs clarification
 # "show me the fuel" → found in multiple files → ask which one
 # ============================================================================
-def gen_ambiguous_clarification_queries() -> List[Dict]:
-    examples = []
+def gen_ambiguous_clarification_queries() -> Iterator[Pair]:
+    dumps = _dumps
 
     # Vague queries with no file specified
+    sql = _SQL["find_category"]
+    extras = (
+        "where is the {cat}",
+        "I need the {cat} data",
+        "can you find {cat} for me",
+        "what {cat} do we have",
+    )
     for cat in ALL_CATEGORIES:
-        for verb in FIND_VERBS + SHOW_VERBS:
-            examples.append({
-                "instruction": f"{verb} {cat}",
-                "input": "",
-                "output": json.dumps({
-                    "intent": "find_category",
-                    "scope": "row",
-                    "slots": {"category": cat, "file_name": None, "source_table": "Expenses"},
-                    "needs_clarification": True,
-                    "clarify_slot": "file_name",
-                    "clarification_question": f"I found '{cat}' in multiple files. Which file are you looking for? Please specify the file name.",
-                    "sql": f"SELECT file_name, COUNT(*) as count FROM ai_documents WHERE metadata->>'Category' ILIKE '%{cat}%' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 GROUP BY file_name;"
-                })
-            })
-        extras = [
-            f"where is the {cat}",
-            f"I need the {cat} data",
-            f"can you find {cat} for me",
-            f"look up {cat}",
-            f"what {cat} do we have",
-        ]
-        for phrase in extras:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "find_category",
-                    "scope": "row",
-                    "slots": {"category": cat, "file_name": None, "source_table": "Expenses"},
-                    "needs_clarification": True,
-                    "clarify_slot": "file_name",
-                    "clarification_question": f"I found '{cat}' in multiple files. Which file are you looking for?",
-                    "sql": f"SELECT file_name, COUNT(*) as count FROM ai_documents WHERE metadata->>'Category' ILIKE '%{cat}%' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 GROUP BY file_name;"
-                })
-            })
+        slots = {"category": cat, "file_name": None, "source_table": "Expenses"}
+        sql_params = [cat]
+        verb_output = {
+            "intent": "find_category",
+            "scope": "row",
+            "slots": slots,
+            "needs_clarification": True,
+            "clarify_slot": "file_name",
+            "clarification_question": f"I found '{cat}' in multiple files. Which file are you looking for? Please specify the file name.",
+            "sql": sql,
+            "sql_params": sql_params
+        }
+        out = dumps(verb_output)
+        for verb in _FIND_OR_SHOW_VERBS:
+            yield f"{verb} {cat}", out
+
+        extra_output = dict(
+            verb_output,
+            clarification_question=f"I found '{cat}' in multiple files. Which file are you looking for?",
+        )
+        out = dumps(extra_output)
+        ctx = {"cat": cat}
+        for template in extras:
+            yield template.format_map(ctx), out
 
     # After clarification — user specifies the file
-    for cat in ALL_CATEGORIES:
-        for file in FILE_NAMES[:5]:
-            phrasings = [
-                f"show me {cat} in {file}",
-                f"find {cat} in {file}",
-                f"get {cat} from {file}",
-                f"show {cat} entries in {file}",
-                f"look for {cat} inside {file}",
-                f"help me find the {cat} in {file}",
-                f"search {cat} in {file}",
-            ]
-            for phrase in phrasings:
-                examples.append({
-                    "instruction": phrase,
-                    "input": "",
-                    "output": json.dumps({
-                        "intent": "find_category_in_file",
-                        "scope": "row",
-                        "slots": {"category": cat, "file_name": file, "source_table": "Expenses"},
-                        "needs_clarification": False,
-                        "sql": f"SELECT * FROM ai_documents WHERE metadata->>'Category' ILIKE '%{cat}%' AND file_name ILIKE '%{file}%' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;"
-                    })
-                })
-    return examples
+    sql = _SQL["find_category_in_file"]
+    phrasings = (
+        "show me {cat} in {file}",
+        "find {cat} in {file}",
+        "get {cat} from {file}",
+        "show {cat} entries in {file}",
+        "look for {cat} inside {file}",
+        "help me find the {cat} in {file}",
+        "search {cat} in {file}",
+    )
+    for cat, file in product(ALL_CATEGORIES, FILE_NAMES[:5]):
+        output = {
+            "intent": "find_category_in_file",
+            "scope": "row",
+            "slots": {"category": cat, "file_name": file, "source_table": "Expenses"},
+            "needs_clarification": False,
+            "sql": sql,
+            "sql_params": [cat, _FILE_PREFIX[file]]
+        }
+        out = dumps(output)
+        ctx = {"cat": cat, "file": file}
+        for template in phrasings:
+            yield template.format_map(ctx), out
 
 
 # ============================================================================
@@ -231,71 +357,72 @@ def gen_ambiguous_clarification_queries() -> List[Dict]:
 # "count all expenses in february" → understand month names
 # Uses user_date column (not metadata key) for date filtering
 # ============================================================================
-MONTHS = {
-    "january":   ("01", "01", "31"),
-    "february":  ("02", "01", "28"),
-    "march":     ("03", "01", "31"),
-    "april":     ("04", "01", "30"),
-    "may":       ("05", "01", "31"),
-    "june":      ("06", "01", "30"),
-    "july":      ("07", "01", "31"),
-    "august":    ("08", "01", "31"),
-    "september": ("09", "01", "30"),
-    "october":   ("10", "01", "31"),
-    "november":  ("11", "01", "30"),
-    "december":  ("12", "01", "31"),
-}
-
-def gen_date_queries() -> List[Dict]:
-    examples = []
-    year = "2026"
-
-    for month_name, (month_num, day_start, day_end) in MONTHS.items():
-        date_start = f"{year}-{month_num}-{day_start}"
-        date_end = f"{year}-{month_num}-{day_end}"
-
+MONTHS = (
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december",
+)
+YEAR = 2026
+
+# (month_name, date_start, date_end) rows, built once at import; month
+# lengths come from the calendar, so February follows leap years.
+_MONTH_ROWS = tuple(
+    (
+        month_name,
+        date(YEAR, month, 1).isoformat(),
+        date(YEAR, month, calendar.monthrange(YEAR, month)[1]).isoformat(),
+    )
+    for month, month_name in enumerate(MONTHS, start=1)
+)
+
+
+def gen_date_queries() -> Iterator[Pair]:
+    dumps = _dumps
+
+    count_sql = _SQL["count_with_date_filter"]
+    show_sql = _SQL["filter_by_month"]
+    count_phrasings = (
+        "count all expenses in {month_name}",
+        "how many expenses in {month_name}",
+        "count the expenses for {month_name}",
+        "give me the count of expenses in {month_name}",
+        "how many entries are there in {month_name}",
+        "total count of expenses in {month_name}",
+    )
+    show_phrasings = (
+        "show expenses in {month_name}",
+        "get all expenses for {month_name}",
+        "display {month_name} expenses",
+        "list expenses from {month_name}",
+        "find all entries in {month_name}",
+    )
+    for month_name, date_start, date_end in _MONTH_ROWS:
         # Count with month name
-        count_phrasings = [
-            f"count all expenses in {month_name}",
-            f"how many expenses in {month_name}",
-            f"count the expenses for {month_name}",
-            f"give me the count of expenses in {month_name}",
-            f"how many entries are there in {month_name}",
-            f"total count of expenses in {month_name}",
-        ]
-        for phrase in count_phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "count_with_date_filter",
-                    "scope": "summary",
-                    "slots": {"date_range": month_name, "date_start": date_start, "date_end": date_end, "source_table": "Expenses"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT COUNT(*) as count FROM ai_documents WHERE user_date >= '{date_start}' AND user_date <= '{date_end}' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
+        slots = {"date_range": month_name, "date_start": date_start, "date_end": date_end, "source_table": "Expenses"}
+        output = {
+            "intent": "count_with_date_filter",
+            "scope": "summary",
+            "slots": slots,
+            "needs_clarification": False,
+            "sql": count_sql,
+            "sql_params": [date_start, date_end]
+        }
+        out = dumps(output)
+        ctx = {"month_name": month_name}
+        for template in count_phrasings:
+            yield template.format_map(ctx), out
 
         # Show with month name
-        show_phrasings = [
-            f"show expenses in {month_name}",
-            f"get all expenses for {month_name}",
-            f"display {month_name} expenses",
-            f"list expenses from {month_name}",
-            f"find all entries in {month_name}",
-        ]
-        for phrase in show_phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "filter_by_date",
-                    "scope": "row",
-                    "slots": {"date_range": month_name, "date_start": date_start, "date_end": date_end, "source_table": "Expenses"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT * FROM ai_documents WHERE user_date >= '{date_start}' AND user_date <= '{date_end}' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
+        output = {
+            "intent": "filter_by_date",
+            "scope": "row",
+            "slots": slots,
+            "needs_clarification": False,
+            "sql": show_sql,
+            "sql_params": [date_start, date_end]
+        }
+        out = dumps(output)
+        for template in show_phrasings:
+            yield template.format_map(ctx), out
 
     # Specific date formats (the real bug: "2026/2/15" returned 20 results for year only)
     specific_dates = [
@@ -308,40 +435,47 @@ def gen_date_queries() -> List[Dict]:
     ]
     # Use Name (Expenses metadata key) instead of non-existent 'method' key
     expense_names = ["gcash", "jabi", "toyota", "cash", "bank transfer", "check"]
+    name_sql = _SQL["find_by_date_and_name"]
+    date_sql = _SQL["filter_by_date"]
+    phrasings = (
+        "find {name} on {raw_date}",
+        "show {name} entries on {raw_date}",
+        "get {name} transactions on {raw_date}",
+        "search for {name} on {raw_date}",
+        "can you find {name} with date {raw_date}",
+    )
+    # Outputs depend on the normalized date, not on how it was written, so
+    # each is encoded once per (name, date) and reused across raw formats
+    name_outputs: Dict[Tuple[str, str], str] = {}
+    date_outputs: Dict[str, str] = {}
     for raw_date, normalized in specific_dates:
+        ctx = {"raw_date": raw_date}
         for name in expense_names:
-            phrasings = [
-                f"find {name} on {raw_date}",
-                f"show {name} entries on {raw_date}",
-                f"get {name} transactions on {raw_date}",
-                f"search for {name} on {raw_date}",
-                f"can you find {name} with date {raw_date}",
-            ]
-            for phrase in phrasings:
-                examples.append({
-                    "instruction": phrase,
-                    "input": "",
-                    "output": json.dumps({
-                        "intent": "find_by_date_and_name",
-                        "scope": "row",
-                        "slots": {"name": name, "date": normalized, "source_table": "Expenses"},
-                        "needs_clarification": False,
-                        "sql": f"SELECT * FROM ai_documents WHERE metadata->>'Name' ILIKE '%{name}%' AND user_date = '{normalized}' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;"
-                    })
+            out = name_outputs.get((name, normalized))
+            if out is None:
+                out = name_outputs[name, normalized] = dumps({
+                    "intent": "find_by_date_and_name",
+                    "scope": "row",
+                    "slots": {"name": name, "date": normalized, "source_table": "Expenses"},
+                    "needs_clarification": False,
+                    "sql": name_sql,
+                    "sql_params": [name, normalized]
                 })
+            ctx["name"] = name
+            for template in phrasings:
+                yield template.format_map(ctx), out
         # Date only (no name filter)
-        examples.append({
-            "instruction": f"show all entries on {raw_date}",
-            "input": "",
-            "output": json.dumps({
+        out = date_outputs.get(normalized)
+        if out is None:
+            out = date_outputs[normalized] = dumps({
                 "intent": "filter_by_date",
                 "scope": "row",
                 "slots": {"date": normalized},
                 "needs_clarification": False,
-                "sql": f"SELECT * FROM ai_documents WHERE user_date = '{normalized}' AND document_type = 'row' AND org_id = $1;"
+                "sql": date_sql,
+                "sql_params": [normalized]
             })
-        })
-    return examples
+        yield f"show all entries on {raw_date}", out
 
 
 # ============================================================================
@@ -349,8 +483,8 @@ def gen_date_queries() -> List[Dict]:
 # "show me all categories in francis gays" → DISTINCT list
 # Uses metadata->>'Category' (correct Expenses key)
 # ============================================================================
-def gen_category_queries() -> List[Dict]:
-    examples = []
+def gen_category_queries() -> Iterator[Pair]:
+    dumps = _dumps
 
     # List all categories globally
     global_phrasings = [
@@ -365,46 +499,45 @@ def gen_category_queries() -> List[Dict]:
         "what category options are there",
         "enumerate all categories",
     ]
+    output = {
+        "intent": "list_categories",
+        "scope": "distinct_values",
+        "slots": {"column": "Category", "source_table": "Expenses"},
+        "needs_clarification": False,
+        "sql": _SQL["list_categories"]
+    }
+    out = dumps(output)
     for phrase in global_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "list_categories",
-                "scope": "distinct_values",
-                "slots": {"column": "Category", "source_table": "Expenses"},
-                "needs_clarification": False,
-                "sql": "SELECT DISTINCT metadata->>'Category' as category FROM ai_documents WHERE metadata->>'Category' IS NOT NULL AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 ORDER BY category;"
-            })
-        })
+        yield phrase, out
 
     # Categories in a specific file
+    sql = _SQL["list_categories_in_file"]
+    phrasings = (
+        "show all categories in {file}",
+        "list categories in {file}",
+        "what categories are in {file}",
+        "get all categories from {file}",
+        "display categories for {file}",
+        "what are the categories in {file}",
+        "show me the categories inside {file}",
+        "list all category types in {file}",
+        "find all categories in {file}",
+        "what category does {file} have",
+    )
     for file in FILE_NAMES:
-        phrasings = [
-            f"show all categories in {file}",
-            f"list categories in {file}",
-            f"what categories are in {file}",
-            f"get all categories from {file}",
-            f"display categories for {file}",
-            f"what are the categories in {file}",
-            f"show me the categories inside {file}",
-            f"list all category types in {file}",
-            f"find all categories in {file}",
-            f"what category does {file} have",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "list_categories_in_file",
-                    "scope": "distinct_values",
-                    "slots": {"column": "Category", "file_name": file, "source_table": "Expenses"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT DISTINCT metadata->>'Category' as category FROM ai_documents WHERE metadata->>'Category' IS NOT NULL AND file_name ILIKE '%{file}%' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 ORDER BY category;"
-                })
-            })
-    return examples
+        sql_params = [_FILE_PREFIX[file]]
+        output = {
+            "intent": "list_categories_in_file",
+            "scope": "distinct_values",
+            "slots": {"column": "Category", "file_name": file, "source_table": "Expenses"},
+            "needs_clarification": False,
+            "sql": sql,
+            "sql_params": sql_params
+        }
+        out = dumps(output)
+        ctx = {"file": file}
+        for template in phrasings:
+            yield template.format_map(ctx), out
 
 
 # ============================================================================
@@ -412,8 +545,8 @@ def gen_category_queries() -> List[Dict]:
 # "compare expenses between francis gays and jc"
 # Uses metadata->>'Expenses' (correct key, not 'amount')
 # ============================================================================
-def gen_comparison_queries() -> List[Dict]:
-    examples = []
+def gen_comparison_queries() -> Iterator[Pair]:
+    dumps = _dumps
     file_pairs = [
         ("francis gays", "jc"),
         ("francis gays", "jash gay"),
@@ -422,92 +555,157 @@ def gen_comparison_queries() -> List[Dict]:
         ("jc", "TEST"),
     ]
 
+    pair_sql = _SQL["compare_expenses"]
+    category_sql = _SQL["compare_category_between_files"]
+    phrasings = (
+        "compare expenses between {f1} and {f2}",
+        "compare {f1} and {f2}",
+        "show the difference between {f1} and {f2}",
+        "what is the difference between {f1} and {f2}",
+        "compare the expenses for {f1} and {f2}",
+        "how do {f1} and {f2} compare",
+        "give me a comparison of {f1} and {f2}",
+        "contrast {f1} with {f2}",
+        "show expenses comparison for {f1} vs {f2}",
+        "compare totals between {f1} and {f2}",
+    )
+    cat_phrasings = (
+        "compare {cat} between {f1} and {f2}",
+        "compare {cat} expenses in {f1} and {f2}",
+        "show {cat} difference between {f1} and {f2}",
+        "how much {cat} in {f1} vs {f2}",
+    )
     for f1, f2 in file_pairs:
         # General expense comparison
-        phrasings = [
-            f"compare expenses between {f1} and {f2}",
-            f"compare {f1} and {f2}",
-            f"show the difference between {f1} and {f2}",
-            f"what is the difference between {f1} and {f2}",
-            f"compare the expenses for {f1} and {f2}",
-            f"how do {f1} and {f2} compare",
-            f"give me a comparison of {f1} and {f2}",
-            f"contrast {f1} with {f2}",
-            f"show expenses comparison for {f1} vs {f2}",
-            f"compare totals between {f1} and {f2}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "compare_expenses",
-                    "scope": "summary",
-                    "slots": {"files": [f1, f2], "source_table": "Expenses"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT file_name, COUNT(*) as item_count, SUM((metadata->>'Expenses')::numeric) as total_amount FROM ai_documents WHERE file_name IN ('{f1}', '{f2}') AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 GROUP BY file_name;"
-                })
-            })
+        output = {
+            "intent": "compare_expenses",
+            "scope": "summary",
+            "slots": {"files": [f1, f2], "source_table": "Expenses"},
+            "needs_clarification": False,
+            "sql": pair_sql,
+            "sql_params": [f1, f2]
+        }
+        out = dumps(output)
+        ctx = {"f1": f1, "f2": f2}
+        for template in phrasings:
+            yield template.format_map(ctx), out
 
         # Category-specific comparison
         for cat in ALL_CATEGORIES[:5]:
-            cat_phrasings = [
-                f"compare {cat} between {f1} and {f2}",
-                f"compare {cat} expenses in {f1} and {f2}",
-                f"show {cat} difference between {f1} and {f2}",
-                f"how much {cat} in {f1} vs {f2}",
-            ]
-            for phrase in cat_phrasings:
-                examples.append({
-                    "instruction": phrase,
-                    "input": "",
-                    "output": json.dumps({
-                        "intent": "compare_category_between_files",
-                        "scope": "summary",
-                        "slots": {"category": cat, "files": [f1, f2], "source_table": "Expenses"},
-                        "needs_clarification": False,
-                        "sql": f"SELECT file_name, COUNT(*) as count, SUM((metadata->>'Expenses')::numeric) as total FROM ai_documents WHERE metadata->>'Category' ILIKE '%{cat}%' AND file_name IN ('{f1}', '{f2}') AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1 GROUP BY file_name;"
-                    })
-                })
-    return examples
+            output = {
+                "intent": "compare_category_between_files",
+                "scope": "summary",
+                "slots": {"category": cat, "files": [f1, f2], "source_table": "Expenses"},
+                "needs_clarification": False,
+                "sql": category_sql,
+                "sql_params": [cat, f1, f2]
+            }
+            out = dumps(output)
+            ctx["cat"] = cat
+            for template in cat_phrasings:
+                yield template.format_map(ctx), out
 
 
 # ============================================================================
 # BUG #6: FUZZY MATCHING
 # "expensive gays" → should match "francis gays"
+# Ranks candidates by pg_trgm similarity to the whole typo instead of an
+# ILIKE on its first word. Requires:
+#   CREATE EXTENSION pg_trgm;
+#   CREATE INDEX ON ai_documents USING gin (file_name gin_trgm_ops);
 # ============================================================================
-def gen_fuzzy_matching_queries() -> List[Dict]:
-    examples = []
-    typo_pairs = [
-        ("francis gay",      "francis gays"),
-        ("expensive gays",   "francis gays"),
-        ("francis",          "francis gays"),
-        ("gays",             "francis gays"),
-        ("jc project",       "jc"),
-        ("jash",             "jash gay"),
-    ]
-    for typo, correct in typo_pairs:
-        phrasings = [
-            f"show me {typo}",
-            f"find {typo}",
-            f"open {typo}",
-            f"get {typo}",
-            f"display {typo}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "fuzzy_file_lookup",
-                    "scope": "file",
-                    "slots": {"file_name_query": typo, "file_name_match": correct},
-                    "needs_clarification": True,
-                    "clarification_question": f"Did you mean '{correct}'? I couldn't find an exact match for '{typo}'.",
-                    "sql": f"SELECT file_name, metadata->>'description' as description FROM ai_documents WHERE file_name ILIKE '%{typo.split()[0]}%' AND document_type = 'file' AND org_id = $1 LIMIT 5;"
-                })
-            })
-    return examples
+FUZZY_VERBS = ["show me", "find", "open", "get", "display"]
+
+# Hand-picked typos seen in production
+TYPO_PAIRS = [
+    ("francis gay",      "francis gays"),
+    ("expensive gays",   "francis gays"),
+    ("francis",          "francis gays"),
+    ("gays",             "francis gays"),
+    ("jc project",       "jc"),
+    ("jash",             "jash gay"),
+]
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent swaps)."""
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def expand_typos(file_names: List[str] = FILE_NAMES, min_length: int = 3) -> List[Tuple[str, str]]:
+    """
+    Generate (typo, file_name) pairs for every file name.
+
+    Typos are single-character deletions, adjacent swaps and, for multi-word
+    names, each word on its own. A typo is kept only if it unambiguously
+    points back at its file: an edit typo's nearest file name must be unique,
+    and a word must belong to that file alone. Typos shorter than
+    *min_length*, or equal to a real file name, are skipped.
+    """
+    lowered = [name.lower() for name in file_names]
+    word_owners: Dict[str, int] = {}
+    for low in lowered:
+        for word in set(low.split()):
+            word_owners[word] = word_owners.get(word, 0) + 1
+
+    pairs = []
+    for name, low in zip(file_names, lowered):
+        edits = [name[:i] + name[i + 1:] for i in range(len(name))]
+        edits += [name[:i] + name[i + 1] + name[i] + name[i + 2:] for i in range(len(name) - 1)]
+        words = name.split() if len(name.split()) > 1 else []
+
+        for typo in dict.fromkeys(edits + words):
+            typo_low = typo.lower()
+            if len(typo) < min_length or typo_low in lowered:
+                continue
+            if typo in words:
+                if word_owners[typo_low] > 1:
+                    continue
+            else:
+                distances = [_edit_distance(typo_low, other) for other in lowered]
+                if distances.count(min(distances)) > 1 or _edit_distance(typo_low, low) != min(distances):
+                    continue
+            pairs.append((typo, name))
+    return pairs
+
+
+def gen_fuzzy_matching_queries() -> Iterator[Pair]:
+    dumps = _dumps
+    sql = _SQL["fuzzy_file_lookup"]
+
+    def _output(typo: str, correct: str) -> str:
+        return dumps({
+            "intent": "fuzzy_file_lookup",
+            "scope": "file",
+            "slots": {"file_name_query": typo, "file_name_match": correct},
+            "needs_clarification": True,
+            "clarification_question": f"Did you mean '{correct}'? I couldn't find an exact match for '{typo}'.",
+            "sql": sql,
+            "sql_params": [typo]
+        })
+
+    # Hand-picked typos with every phrasing
+    for typo, correct in TYPO_PAIRS:
+        output = _output(typo, correct)
+        for verb in FUZZY_VERBS:
+            yield f"{verb} {typo}", output
+
+    # Generated typos, one phrasing each (rotating) to keep the intent balanced
+    known = {typo.lower() for typo, _ in TYPO_PAIRS}
+    generated = [pair for pair in expand_typos() if pair[0].lower() not in known]
+    for i, (typo, correct) in enumerate(generated):
+        verb = FUZZY_VERBS[i % len(FUZZY_VERBS)]
+        yield f"{verb} {typo}", _output(typo, correct)
 
 
 # ============================================================================
@@ -515,51 +713,55 @@ def gen_fuzzy_matching_queries() -> List[Dict]:
 # Uses metadata->>'Expenses' for expense amounts (correct key)
 # Uses metadata->>'Amount' for CashFlow amounts (correct key)
 # ============================================================================
-def gen_sum_queries() -> List[Dict]:
-    examples = []
+def gen_sum_queries() -> Iterator[Pair]:
+    dumps = _dumps
 
     # Expense sum queries — uses metadata->>'Expenses' with ::numeric
+    sql = _SQL["sum_expenses"]
+    phrasings = (
+        "how much is the total expenses in {file}",
+        "what is the total amount in {file}",
+        "get the total for {file}",
+        "sum up all expenses in {file}",
+        "what is the grand total of {file}",
+        "show total expenses for {file}",
+    )
     for file in FILE_NAMES[:5]:
-        phrasings = [
-            f"how much is the total expenses in {file}",
-            f"what is the total amount in {file}",
-            f"get the total for {file}",
-            f"sum up all expenses in {file}",
-            f"what is the grand total of {file}",
-            f"show total expenses for {file}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "sum_expenses",
-                    "scope": "summary",
-                    "slots": {"file_name": file, "source_table": "Expenses"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT SUM((metadata->>'Expenses')::numeric) as total FROM ai_documents WHERE file_name ILIKE '%{file}%' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
+        sql_params = [_FILE_PREFIX[file]]
+        output = {
+            "intent": "sum_expenses",
+            "scope": "summary",
+            "slots": {"file_name": file, "source_table": "Expenses"},
+            "needs_clarification": False,
+            "sql": sql,
+            "sql_params": sql_params
+        }
+        out = dumps(output)
+        ctx = {"file": file}
+        for template in phrasings:
+            yield template.format_map(ctx), out
+
+    sql = _SQL["sum_by_category"]
+    phrasings = (
+        "total {cat} expenses",
+        "what is the total amount for {cat}",
+        "sum all {cat} entries",
+        "how much did we spend on {cat}",
+    )
     for cat in ALL_CATEGORIES:
-        phrasings = [
-            f"total {cat} expenses",
-            f"what is the total amount for {cat}",
-            f"sum all {cat} entries",
-            f"how much did we spend on {cat}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "sum_by_category",
-                    "scope": "summary",
-                    "slots": {"category": cat, "source_table": "Expenses"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT SUM((metadata->>'Expenses')::numeric) as total FROM ai_documents WHERE metadata->>'Category' ILIKE '%{cat}%' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
+        sql_params = [cat]
+        output = {
+            "intent": "sum_by_category",
+            "scope": "summary",
+            "slots": {"category": cat, "source_table": "Expenses"},
+            "needs_clarification": False,
+            "sql": sql,
+            "sql_params": sql_params
+        }
+        out = dumps(output)
+        ctx = {"cat": cat}
+        for template in phrasings:
+            yield template.format_map(ctx), out
 
     # CashFlow sum queries — uses metadata->>'Amount' with ::numeric
     cashflow_phrasings = [
@@ -569,73 +771,118 @@ def gen_sum_queries() -> List[Dict]:
         "how much is the total cash flow",
         "get the total amount of cash flow",
     ]
+    output = {
+        "intent": "sum_cashflow",
+        "scope": "summary",
+        "slots": _TABLE_SLOTS["CashFlow"],
+        "needs_clarification": False,
+        "sql": _SQL["sum_cashflow"]
+    }
+    out = dumps(output)
     for phrase in cashflow_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "sum_cashflow",
-                "scope": "summary",
-                "slots": {"source_table": "CashFlow"},
-                "needs_clarification": False,
-                "sql": "SELECT SUM((metadata->>'Amount')::numeric) as total FROM ai_documents WHERE source_table = 'CashFlow' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
+        yield phrase, out
 
     # CashFlow by type
+    sql = _SQL["sum_cashflow_by_type"]
+    phrasings = (
+        "total {cf_type} in cash flow",
+        "sum of {cf_type} cash flow",
+        "how much {cf_type} in cash flow",
+    )
     for cf_type in ["income", "expense", "transfer"]:
-        phrasings = [
-            f"total {cf_type} in cash flow",
-            f"sum of {cf_type} cash flow",
-            f"how much {cf_type} in cash flow",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "sum_cashflow_by_type",
-                    "scope": "summary",
-                    "slots": {"type": cf_type, "source_table": "CashFlow"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT SUM((metadata->>'Amount')::numeric) as total FROM ai_documents WHERE metadata->>'Type' ILIKE '%{cf_type}%' AND source_table = 'CashFlow' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    return examples
+        sql_params = [cf_type]
+        output = {
+            "intent": "sum_cashflow_by_type",
+            "scope": "summary",
+            "slots": {"type": cf_type, "source_table": "CashFlow"},
+            "needs_clarification": False,
+            "sql": sql,
+            "sql_params": sql_params
+        }
+        out = dumps(output)
+        ctx = {"cf_type": cf_type}
+        for template in phrasings:
+            yield template.format_map(ctx), out
 
 
 # ============================================================================
 # BONUS: CONVERSATION CONTEXT (clarification follow-up)
 # Uses file_name column (not metadata->>'file_name')
 # ============================================================================
-def gen_conversation_context_queries() -> List[Dict]:
-    examples = []
+def gen_conversation_context_queries() -> Iterator[Pair]:
+    dumps = _dumps
+    category_sql = _SQL["clarification_response"]
+    option_sql = _SQL["clarification_response_numeric"]
     for file in FILE_NAMES[:5]:
         for cat in ALL_CATEGORIES[:4]:
-            examples.append({
-                "instruction": f"[CONTEXT: User asked 'show {cat}'. AI found in multiple files. User chose:] {file}",
-                "input": "",
-                "output": json.dumps({
+            yield (
+                f"[CONTEXT: User asked 'show {cat}'. AI found in multiple files. User chose:] {file}",
+                dumps({
                     "intent": "clarification_response",
                     "scope": "row",
                     "slots": {"category": cat, "file_name": file, "source_table": "Expenses"},
                     "needs_clarification": False,
-                    "sql": f"SELECT * FROM ai_documents WHERE searchable_text ILIKE '%{cat}%' AND file_name ILIKE '%{file}%' AND source_table = 'Expenses' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-        examples.append({
-            "instruction": f"[CONTEXT: AI asked which file. Options: 1. {file} 2. jc. User chose:] 1",
-            "input": "",
-            "output": json.dumps({
+                    "sql": category_sql,
+                    "sql_params": [cat, _FILE_PREFIX[file]]
+                }),
+            )
+        yield (
+            f"[CONTEXT: AI asked which file. Options: 1. {file} 2. jc. User chose:] 1",
+            dumps({
                 "intent": "clarification_response_numeric",
                 "scope": "row",
                 "slots": {"selected_option": 1, "file_name": file},
                 "needs_clarification": False,
-                "sql": f"SELECT * FROM ai_documents WHERE file_name ILIKE '%{file}%' AND document_type = 'row' AND org_id = $1;"
+                "sql": option_sql,
+                "sql_params": [_FILE_PREFIX[file]]
+            }),
+        )
+
+
+# ============================================================================
+# TABLE LOOKUPS (Project, Quotation, QuotationItem)
+# These three generators are declared as IntentSpec tables rather than
+# hand-written loops. A spec without a slot is a whole-table query (list,
+# count, sum) with plain phrasings. A spec with a slot fills each of its
+# phrasing templates ("{}" marks the value) with every slot value.
+# ============================================================================
+@dataclass(frozen=True)
+class IntentSpec:
+    """One intent of a table-lookup generator."""
+    intent: str
+    scope: str
+    source_table: str
+    phrasings: Tuple[str, ...]
+    slot: Optional[str] = None            # slots key, e.g. "project_name"
+    values: Tuple[str, ...] = ()          # slot values, bound as $2
+
+
+def _gen_from_specs(specs: Tuple[IntentSpec, ...]) -> Iterator[Pair]:
+    dumps = _dumps
+    for spec in specs:
+        sql = _SQL[spec.intent]
+        if spec.slot is None:
+            out = dumps({
+                "intent": spec.intent,
+                "scope": spec.scope,
+                "slots": _TABLE_SLOTS[spec.source_table],
+                "needs_clarification": False,
+                "sql": sql
             })
-        })
-    return examples
+            for phrase in spec.phrasings:
+                yield phrase, out
+            continue
+        for value in spec.values:
+            out = dumps({
+                "intent": spec.intent,
+                "scope": spec.scope,
+                "slots": {spec.slot: value, "source_table": spec.source_table},
+                "needs_clarification": False,
+                "sql": sql,
+                "sql_params": [value]
+            })
+            for template in spec.phrasings:
+                yield template.format(value), out
 
 
 # ============================================================================
@@ -643,11 +890,8 @@ def gen_conversation_context_queries() -> List[Dict]:
 # Source table: Project
 # Metadata keys: project_name, client_name, location, status
 # ============================================================================
-def gen_project_queries() -> List[Dict]:
-    examples = []
-
-    # List all projects
-    list_phrasings = [
+_PROJECT_SPECS = (
+    IntentSpec("list_projects", "row", "Project", (
         "list all projects",
         "show all projects",
         "get all projects",
@@ -655,125 +899,42 @@ def gen_project_queries() -> List[Dict]:
         "display all projects",
         "show me the projects",
         "enumerate all projects",
-    ]
-    for phrase in list_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "list_projects",
-                "scope": "row",
-                "slots": {"source_table": "Project"},
-                "needs_clarification": False,
-                "sql": "SELECT metadata->>'project_name' as project_name, metadata->>'client_name' as client_name, metadata->>'location' as location, metadata->>'status' as status FROM ai_documents WHERE source_table = 'Project' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
-
-    # Query by project name
-    for project in PROJECTS:
-        phrasings = [
-            f"show project {project}",
-            f"find project {project}",
-            f"get details for project {project}",
-            f"show me {project} project",
-            f"what is the status of {project}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_project",
-                    "scope": "row",
-                    "slots": {"project_name": project, "source_table": "Project"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'project_name' as project_name, metadata->>'client_name' as client_name, metadata->>'location' as location, metadata->>'status' as status FROM ai_documents WHERE metadata->>'project_name' ILIKE '%{project}%' AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Query by client name
-    for client in CLIENT_NAMES:
-        phrasings = [
-            f"show projects for {client}",
-            f"find projects by {client}",
-            f"what projects does {client} have",
-            f"list projects for client {client}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_project_by_client",
-                    "scope": "row",
-                    "slots": {"client_name": client, "source_table": "Project"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'project_name' as project_name, metadata->>'client_name' as client_name, metadata->>'location' as location, metadata->>'status' as status FROM ai_documents WHERE metadata->>'client_name' ILIKE '%{client}%' AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Query by location
-    for loc in LOCATIONS:
-        phrasings = [
-            f"show projects in {loc}",
-            f"find projects located in {loc}",
-            f"what projects are in {loc}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_project_by_location",
-                    "scope": "row",
-                    "slots": {"location": loc, "source_table": "Project"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'project_name' as project_name, metadata->>'client_name' as client_name, metadata->>'location' as location, metadata->>'status' as status FROM ai_documents WHERE metadata->>'location' ILIKE '%{loc}%' AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Query by status
-    for status in PROJECT_STATUSES:
-        phrasings = [
-            f"show {status} projects",
-            f"list all {status} projects",
-            f"what projects are {status}",
-            f"find projects with status {status}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_project_by_status",
-                    "scope": "row",
-                    "slots": {"status": status, "source_table": "Project"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'project_name' as project_name, metadata->>'client_name' as client_name, metadata->>'location' as location, metadata->>'status' as status FROM ai_documents WHERE metadata->>'status' ILIKE '%{status}%' AND source_table = 'Project' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Count projects
-    count_phrasings = [
+    )),
+    IntentSpec("query_project", "row", "Project", (
+        "show project {}",
+        "find project {}",
+        "get details for project {}",
+        "show me {} project",
+        "what is the status of {}",
+    ), slot="project_name", values=tuple(PROJECTS)),
+    IntentSpec("query_project_by_client", "row", "Project", (
+        "show projects for {}",
+        "find projects by {}",
+        "what projects does {} have",
+        "list projects for client {}",
+    ), slot="client_name", values=tuple(CLIENT_NAMES)),
+    IntentSpec("query_project_by_location", "row", "Project", (
+        "show projects in {}",
+        "find projects located in {}",
+        "what projects are in {}",
+    ), slot="location", values=tuple(LOCATIONS)),
+    IntentSpec("query_project_by_status", "row", "Project", (
+        "show {} projects",
+        "list all {} projects",
+        "what projects are {}",
+        "find projects with status {}",
+    ), slot="status", values=tuple(PROJECT_STATUSES)),
+    IntentSpec("count_projects", "summary", "Project", (
         "how many projects do we have",
         "count all projects",
         "total number of projects",
         "how many projects are there",
-    ]
-    for phrase in count_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "count_projects",
-                "scope": "summary",
-                "slots": {"source_table": "Project"},
-                "needs_clarification": False,
-                "sql": "SELECT COUNT(*) as count FROM ai_documents WHERE source_table = 'Project' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
+    )),
+)
+
 
-    return examples
+def gen_project_queries() -> Iterator[Pair]:
+    return _gen_from_specs(_PROJECT_SPECS)
 
 
 # ============================================================================
@@ -782,137 +943,53 @@ def gen_project_queries() -> List[Dict]:
 # Metadata keys: quote_number, status, total_amount, project_name
 # Numeric keys: total_amount
 # ============================================================================
-def gen_quotation_queries() -> List[Dict]:
-    examples = []
-
-    # List all quotations
-    list_phrasings = [
+_QUOTATION_SPECS = (
+    IntentSpec("list_quotations", "row", "Quotation", (
         "list all quotations",
         "show all quotations",
         "get all quotes",
         "what quotations do we have",
         "display all quotations",
         "show me the quotes",
-    ]
-    for phrase in list_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "list_quotations",
-                "scope": "row",
-                "slots": {"source_table": "Quotation"},
-                "needs_clarification": False,
-                "sql": "SELECT metadata->>'quote_number' as quote_number, metadata->>'status' as status, metadata->>'total_amount' as total_amount, metadata->>'project_name' as project_name FROM ai_documents WHERE source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
-
-    # Query by quote number
-    for qnum in QUOTATION_NUMBERS:
-        phrasings = [
-            f"show quotation {qnum}",
-            f"find quote {qnum}",
-            f"get details for {qnum}",
-            f"show me {qnum}",
-            f"what is the status of {qnum}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_quotation",
-                    "scope": "row",
-                    "slots": {"quote_number": qnum, "source_table": "Quotation"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'quote_number' as quote_number, metadata->>'status' as status, metadata->>'total_amount' as total_amount, metadata->>'project_name' as project_name FROM ai_documents WHERE metadata->>'quote_number' ILIKE '%{qnum}%' AND source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Query by quotation status
-    for status in QUOTATION_STATUSES:
-        phrasings = [
-            f"show {status} quotations",
-            f"list all {status} quotes",
-            f"what quotations are {status}",
-            f"find quotes with status {status}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_quotation_by_status",
-                    "scope": "row",
-                    "slots": {"status": status, "source_table": "Quotation"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'quote_number' as quote_number, metadata->>'status' as status, metadata->>'total_amount' as total_amount, metadata->>'project_name' as project_name FROM ai_documents WHERE metadata->>'status' ILIKE '%{status}%' AND source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Query quotations by project name
-    for project in PROJECTS:
-        phrasings = [
-            f"show quotations for {project}",
-            f"find quotes for project {project}",
-            f"what quotations are for {project}",
-            f"list quotes for {project}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_quotation_by_project",
-                    "scope": "row",
-                    "slots": {"project_name": project, "source_table": "Quotation"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'quote_number' as quote_number, metadata->>'status' as status, metadata->>'total_amount' as total_amount, metadata->>'project_name' as project_name FROM ai_documents WHERE metadata->>'project_name' ILIKE '%{project}%' AND source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Sum total_amount (numeric key)
-    sum_phrasings = [
+    )),
+    IntentSpec("query_quotation", "row", "Quotation", (
+        "show quotation {}",
+        "find quote {}",
+        "get details for {}",
+        "show me {}",
+        "what is the status of {}",
+    ), slot="quote_number", values=tuple(QUOTATION_NUMBERS)),
+    IntentSpec("query_quotation_by_status", "row", "Quotation", (
+        "show {} quotations",
+        "list all {} quotes",
+        "what quotations are {}",
+        "find quotes with status {}",
+    ), slot="status", values=tuple(QUOTATION_STATUSES)),
+    IntentSpec("query_quotation_by_project", "row", "Quotation", (
+        "show quotations for {}",
+        "find quotes for project {}",
+        "what quotations are for {}",
+        "list quotes for {}",
+    ), slot="project_name", values=tuple(PROJECTS)),
+    # total_amount is a numeric key
+    IntentSpec("sum_quotation_amount", "summary", "Quotation", (
         "total amount of all quotations",
         "what is the total quotation amount",
         "sum all quotation amounts",
         "how much are all the quotations worth",
         "get the total value of all quotes",
-    ]
-    for phrase in sum_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "sum_quotation_amount",
-                "scope": "summary",
-                "slots": {"source_table": "Quotation"},
-                "needs_clarification": False,
-                "sql": "SELECT SUM((metadata->>'total_amount')::numeric) as total FROM ai_documents WHERE source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
-
-    # Count quotations
-    count_phrasings = [
+    )),
+    IntentSpec("count_quotations", "summary", "Quotation", (
         "how many quotations do we have",
         "count all quotations",
         "total number of quotes",
         "how many quotes are there",
-    ]
-    for phrase in count_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "count_quotations",
-                "scope": "summary",
-                "slots": {"source_table": "Quotation"},
-                "needs_clarification": False,
-                "sql": "SELECT COUNT(*) as count FROM ai_documents WHERE source_table = 'Quotation' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
+    )),
+)
 
-    return examples
+
+def gen_quotation_queries() -> Iterator[Pair]:
+    return _gen_from_specs(_QUOTATION_SPECS)
 
 
 # ============================================================================
@@ -921,254 +998,345 @@ def gen_quotation_queries() -> List[Dict]:
 # Metadata keys: plate_no, dr_no, material, quarry_location, truck_type, volume, line_total
 # Numeric keys: volume, line_total
 # ============================================================================
-def gen_quotation_item_queries() -> List[Dict]:
-    examples = []
-
-    # List all deliveries/line items
-    list_phrasings = [
+_QUOTATION_ITEM_SPECS = (
+    IntentSpec("list_quotation_items", "row", "QuotationItem", (
         "list all deliveries",
         "show all line items",
         "get all delivery records",
         "what deliveries do we have",
         "display all line items",
         "show me the deliveries",
-    ]
-    for phrase in list_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "list_quotation_items",
-                "scope": "row",
-                "slots": {"source_table": "QuotationItem"},
-                "needs_clarification": False,
-                "sql": "SELECT metadata->>'plate_no' as plate_no, metadata->>'dr_no' as dr_no, metadata->>'material' as material, metadata->>'quarry_location' as quarry_location, metadata->>'truck_type' as truck_type, metadata->>'volume' as volume, metadata->>'line_total' as line_total FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
-
-    # Query by plate number
-    for plate in PLATE_NUMBERS:
-        phrasings = [
-            f"show deliveries for plate {plate}",
-            f"find deliveries with plate number {plate}",
-            f"get all records for plate {plate}",
-            f"show me plate {plate} deliveries",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_by_plate",
-                    "scope": "row",
-                    "slots": {"plate_no": plate, "source_table": "QuotationItem"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'plate_no' as plate_no, metadata->>'dr_no' as dr_no, metadata->>'material' as material, metadata->>'volume' as volume, metadata->>'line_total' as line_total FROM ai_documents WHERE metadata->>'plate_no' ILIKE '%{plate}%' AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Query by DR number
-    for dr in DR_NUMBERS:
-        phrasings = [
-            f"show delivery {dr}",
-            f"find DR {dr}",
-            f"get details for {dr}",
-            f"show me DR number {dr}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_by_dr",
-                    "scope": "row",
-                    "slots": {"dr_no": dr, "source_table": "QuotationItem"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'plate_no' as plate_no, metadata->>'dr_no' as dr_no, metadata->>'material' as material, metadata->>'volume' as volume, metadata->>'line_total' as line_total FROM ai_documents WHERE metadata->>'dr_no' ILIKE '%{dr}%' AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Query by material
-    for mat in MATERIALS:
-        phrasings = [
-            f"show all {mat} deliveries",
-            f"find deliveries of {mat}",
-            f"get all {mat} line items",
-            f"how many {mat} deliveries",
-            f"list {mat} records",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "query_by_material",
-                    "scope": "row",
-                    "slots": {"material": mat, "source_table": "QuotationItem"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT metadata->>'plate_no' as plate_no, metadata->>'dr_no' as dr_no, metadata->>'material' as material, metadata->>'volume' as volume, metadata->>'line_total' as line_total FROM ai_documents WHERE metadata->>'material' ILIKE '%{mat}%' AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Sum volume (numeric key)
-    volume_phrasings = [
+    )),
+    IntentSpec("query_by_plate", "row", "QuotationItem", (
+        "show deliveries for plate {}",
+        "find deliveries with plate number {}",
+        "get all records for plate {}",
+        "show me plate {} deliveries",
+    ), slot="plate_no", values=tuple(PLATE_NUMBERS)),
+    IntentSpec("query_by_dr", "row", "QuotationItem", (
+        "show delivery {}",
+        "find DR {}",
+        "get details for {}",
+        "show me DR number {}",
+    ), slot="dr_no", values=tuple(DR_NUMBERS)),
+    IntentSpec("query_by_material", "row", "QuotationItem", (
+        "show all {} deliveries",
+        "find deliveries of {}",
+        "get all {} line items",
+        "how many {} deliveries",
+        "list {} records",
+    ), slot="material", values=tuple(MATERIALS)),
+    # volume and line_total are numeric keys
+    IntentSpec("sum_volume", "summary", "QuotationItem", (
         "total volume delivered",
         "what is the total volume",
         "sum all delivery volumes",
         "how much volume was delivered",
         "get the total volume of all deliveries",
-    ]
-    for phrase in volume_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "sum_volume",
-                "scope": "summary",
-                "slots": {"source_table": "QuotationItem"},
-                "needs_clarification": False,
-                "sql": "SELECT SUM((metadata->>'volume')::numeric) as total_volume FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
-
-    # Sum line_total (numeric key)
-    total_phrasings = [
+    )),
+    IntentSpec("sum_line_total", "summary", "QuotationItem", (
         "total line total of all deliveries",
         "what is the total cost of all line items",
         "sum all line totals",
         "how much are all deliveries worth",
         "get the total value of all deliveries",
-    ]
-    for phrase in total_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "sum_line_total",
-                "scope": "summary",
-                "slots": {"source_table": "QuotationItem"},
-                "needs_clarification": False,
-                "sql": "SELECT SUM((metadata->>'line_total')::numeric) as total FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
-
-    # Sum volume by material
-    for mat in MATERIALS:
-        phrasings = [
-            f"total volume of {mat}",
-            f"how much {mat} was delivered",
-            f"sum volume for {mat}",
-        ]
-        for phrase in phrasings:
-            examples.append({
-                "instruction": phrase,
-                "input": "",
-                "output": json.dumps({
-                    "intent": "sum_volume_by_material",
-                    "scope": "summary",
-                    "slots": {"material": mat, "source_table": "QuotationItem"},
-                    "needs_clarification": False,
-                    "sql": f"SELECT SUM((metadata->>'volume')::numeric) as total_volume FROM ai_documents WHERE metadata->>'material' ILIKE '%{mat}%' AND source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-                })
-            })
-
-    # Count deliveries
-    count_phrasings = [
+    )),
+    IntentSpec("sum_volume_by_material", "summary", "QuotationItem", (
+        "total volume of {}",
+        "how much {} was delivered",
+        "sum volume for {}",
+    ), slot="material", values=tuple(MATERIALS)),
+    IntentSpec("count_deliveries", "summary", "QuotationItem", (
         "how many deliveries do we have",
         "count all deliveries",
         "total number of line items",
         "how many line items are there",
-    ]
-    for phrase in count_phrasings:
-        examples.append({
-            "instruction": phrase,
-            "input": "",
-            "output": json.dumps({
-                "intent": "count_deliveries",
-                "scope": "summary",
-                "slots": {"source_table": "QuotationItem"},
-                "needs_clarification": False,
-                "sql": "SELECT COUNT(*) as count FROM ai_documents WHERE source_table = 'QuotationItem' AND document_type = 'row' AND org_id = $1;"
-            })
-        })
+    )),
+)
 
-    return examples
+
+def gen_quotation_item_queries() -> Iterator[Pair]:
+    return _gen_from_specs(_QUOTATION_ITEM_SPECS)
 
 
 # ============================================================================
 # MAIN GENERATOR
 # ============================================================================
-def generate_all_examples() -> List[Dict]:
-    all_examples = []
-    all_examples.extend(gen_file_level_queries())
-    all_examples.extend(gen_ambiguous_clarification_queries())
-    all_examples.extend(gen_date_queries())
-    all_examples.extend(gen_category_queries())
-    all_examples.extend(gen_comparison_queries())
-    all_examples.extend(gen_fuzzy_matching_queries())
-    all_examples.extend(gen_sum_queries())
-    all_examples.extend(gen_conversation_context_queries())
-    all_examples.extend(gen_project_queries())
-    all_examples.extend(gen_quotation_queries())
-    all_examples.extend(gen_quotation_item_queries())
-    return all_examples
-
-
-def save_jsonl(examples: List[Dict], output_path: str):
+GENERATORS = (
+    gen_file_level_queries,
+    gen_ambiguous_clarification_queries,
+    gen_date_queries,
+    gen_category_queries,
+    gen_comparison_queries,
+    gen_fuzzy_matching_queries,
+    gen_sum_queries,
+    gen_conversation_context_queries,
+    gen_project_queries,
+    gen_quotation_queries,
+    gen_quotation_item_queries,
+)
+
+
+def _run_generator(index: int) -> List[Pair]:
+    """Process-pool worker: materialise ``GENERATORS[index]``."""
+    return list(GENERATORS[index]())
+
+
+def _iter_generated(workers: int = 1) -> Iterator[Pair]:
+    if workers <= 1:
+        # Each generator is only started once the previous one is exhausted
+        yield from chain.from_iterable(gen() for gen in GENERATORS)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(GENERATORS))) as pool:
+        yield from chain.from_iterable(pool.map(_run_generator, range(len(GENERATORS))))
+
+
+def iter_pairs(workers: int = 1) -> Iterator[Pair]:
+    """
+    Yield every ``(instruction, output)`` pair, one generator after another.
+
+    With ``workers > 1`` the generators run concurrently in a process pool;
+    pairs still come out in the same order. Repeated instructions (verb
+    lists overlap, and some phrasings recur across generators) are dropped,
+    keeping the first occurrence, so no instruction has two targets.
+    """
+    seen = set()
+    for pair in _iter_generated(workers):
+        instruction = pair[0]
+        if instruction not in seen:
+            seen.add(instruction)
+            yield pair
+
+
+def _as_examples(pairs: Iterable[Pair]) -> Iterator[Dict]:
+    for instruction, output in pairs:
+        yield {"instruction": instruction, "input": "", "output": output}
+
+
+def iter_examples(workers: int = 1) -> Iterator[Dict]:
+    """Yield every training example as an instruction/input/output dict."""
+    return _as_examples(iter_pairs(workers))
+
+
+def generate_all_examples(workers: int = 1) -> List[Dict]:
+    return list(iter_examples(workers))
+
+
+@lru_cache(maxsize=None)
+def _output_meta(output: str) -> Tuple[str, str]:
+    """
+    ``(intent, source_table)`` of a serialised output.
+
+    Generators share one output string across every phrasing of a slot
+    value, so each distinct output is parsed once however many examples
+    carry it.
+    """
+    out = json.loads(output)
+    return out.get("intent", "unknown"), out.get("slots", {}).get("source_table", "unspecified")
+
+
+def write_lines(lines: Iterable[str], output_path: str, batch_size: int = 4096) -> int:
+    """
+    Write already-serialised JSONL *lines*, joining ``batch_size`` per write.
+
+    Each batch is encoded to UTF-8 once and written to a binary file,
+    bypassing the per-write encoding of a text-mode file. A batch is larger
+    than the file buffer, so it goes straight to a single write() call;
+    an unbuffered fd or a pre-sized mmap would not save a copy (and mmap
+    needs the total size up front, which a streamed run does not know).
+    """
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    lines = iter(lines)
+    with open(output_path, "wb") as f:
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch:
+                break
+            f.write("".join(batch).encode("utf-8"))
+            count += len(batch)
+    print(f"Saved {count} examples to {output_path}")
+    return count
+
+
+def save_jsonl(
+    examples: Iterable[Dict],
+    output_path: str,
+    batch_size: int = 4096,
+    nested_output: bool = False,
+) -> int:
+    """
+    Write *examples* as JSONL. ``output`` is a JSON string (the training
+    target text) unless *nested_output*, which writes it as an object.
+    """
+    emit = _emit_nested_line if nested_output else _emit_line
+    return write_lines((emit(ex["instruction"], ex["output"]) for ex in examples), output_path, batch_size)
+
+
+def save_parquet(examples: Iterable[Dict], output_path: str, batch_size: int = 10_000) -> int:
+    """
+    Write *examples* to Parquet in ``batch_size``-row record batches.
+
+    Columns are ``instruction``, ``input``, ``output`` and ``intent`` (the
+    latter dictionary-encoded), compressed with zstd. Needs the optional
+    ``pyarrow`` package (installed alongside HuggingFace ``datasets``).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from exc
+
+    schema = pa.schema([
+        ("instruction", pa.string()),
+        ("input", pa.string()),
+        ("output", pa.string()),
+        ("intent", pa.dictionary(pa.int16(), pa.string())),
+    ])
+    types = [schema.field(name).type for name in schema.names]
+
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        for ex in examples:
-            f.write(json.dumps(ex, ensure_ascii=False) + "\n")
-    print(f"Saved {len(examples)} examples to {output_path}")
+    count = 0
+    examples = iter(examples)
+    with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+        while True:
+            batch = list(islice(examples, batch_size))
+            if not batch:
+                break
+            columns = (
+                [ex["instruction"] for ex in batch],
+                [ex["input"] for ex in batch],
+                [ex["output"] for ex in batch],
+                [_output_meta(ex["output"])[0] for ex in batch],
+            )
+            writer.write_batch(pa.record_batch(
+                [pa.array(values, type=t) for values, t in zip(columns, types)],
+                schema=schema,
+            ))
+            count += len(batch)
+    print(f"Saved {count} examples to {output_path}")
+    return count
+
+
+def _cache_key(count: int, suffix: str, nested_output: bool = False) -> str:
+    """
+    Content key for a generated dataset: this script's source (every
+    vocabulary, phrasing and SQL text lives in it) plus the options that
+    change the output.
+
+    The key deliberately hashes only this file. Moving vocabulary or SQL
+    into an imported module would leave cached output stale, so such a
+    module's source would have to be added to the digest here.
+    """
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(f"{count}:{suffix}:{nested_output}".encode())
+    return digest.hexdigest()
+
+
+def _print_summary(intents: Counter, source_tables: Counter, total: int, breakdown: bool = True) -> None:
+    if breakdown:
+        print("\nBreakdown by intent:")
+        for intent, count in intents.most_common():
+            print(f"  {intent}: {count}")
+
+        print("\nBreakdown by source_table:")
+        for st, count in source_tables.most_common():
+            print(f"  {st}: {count}")
+
+    print(f"\nTotal: {total} examples")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Generate training data for AU-Ggregates AI")
-    parser.add_argument("--output", default="data/training_bugfix.jsonl", help="Output JSONL file path")
+    parser.add_argument("--output", default="data/training_bugfix.jsonl", help="Output file path (.jsonl, or .parquet for columnar output)")
     parser.add_argument("--count", type=int, default=0, help="Max examples (0 = all)")
     parser.add_argument("--shuffle", action="store_true", help="Shuffle examples")
+    parser.add_argument("--workers", type=int, default=1, help="Generator processes (0 = one per CPU; default: 1, in-process)")
+    parser.add_argument("--nested-output", action="store_true", help="JSONL only: write each output as a JSON object instead of a JSON string")
+    parser.add_argument("--quiet", action="store_true", help="Skip the intent/source_table breakdown")
+    parser.add_argument("--cache-dir", default=None, help="Reuse output of an identical script and options from this directory (ignored with --shuffle)")
     args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+
+    cached = summary = None
+    if args.cache_dir and not args.shuffle:
+        # The breakdown is stored next to the cached output so a hit prints
+        # the same summary as the run that produced it
+        suffix = Path(args.output).suffix
+        cached = Path(args.cache_dir) / f"{_cache_key(args.count, suffix, args.nested_output)}{suffix}"
+        summary = cached.with_name(f"{cached.stem}.summary.json")
+        if cached.exists() and summary.exists():
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cached, args.output)
+            print(f"Inputs unchanged: copied {cached} to {args.output}")
+            saved = json.loads(summary.read_text(encoding="utf-8"))
+            _print_summary(
+                Counter(dict(saved["intents"])),
+                Counter(dict(saved["source_tables"])),
+                saved["total"],
+                breakdown=not args.quiet,
+            )
+            return
+
+    # Breakdown by intent and source_table, tallied as examples are written
+    intents = Counter()
+    source_tables = Counter()
+
+    def _tally(pairs: Iterable[Pair]) -> Iterator[Pair]:
+        for pair in pairs:
+            intent, st = _output_meta(pair[1])
+            intents[intent] += 1
+            source_tables[st] += 1
+            yield pair
 
     print("Generating training examples...")
-    examples = generate_all_examples()
+    parquet = args.output.endswith(".parquet")
+    emit = _emit_nested_line if args.nested_output else _emit_line
+    if args.shuffle and not parquet:
+        # Shuffling needs every example in memory. Hold them as serialised
+        # lines with their (intent, source_table) in a parallel list, rather
+        # than as dicts, and write them out in a sampled index order.
+        lines: List[str] = []
+        metas: List[Tuple[str, str]] = []
+        for instruction, output in iter_pairs(workers):
+            lines.append(emit(instruction, output))
+            if not args.quiet:
+                metas.append(_output_meta(output))
+        # Sampling --count indices (all of them by default) shuffles
+        # without permuting the full list first
+        order = random.sample(range(len(lines)), min(args.count or len(lines), len(lines)))
+        if not args.quiet:
+            intents.update(metas[i][0] for i in order)
+            source_tables.update(metas[i][1] for i in order)
+        total = write_lines((lines[i] for i in order), args.output)
+    else:
+        pairs = iter_pairs(workers)
+        if args.shuffle:
+            pairs = list(pairs)
+            pairs = random.sample(pairs, min(args.count or len(pairs), len(pairs)))
+        elif args.count > 0:
+            # Stream straight to disk
+            pairs = islice(pairs, args.count)
+        if not args.quiet or cached is not None:
+            pairs = _tally(pairs)
 
-    if args.shuffle:
-        random.shuffle(examples)
-
-    if args.count > 0:
-        examples = examples[:args.count]
-
-    save_jsonl(examples, args.output)
-
-    # Breakdown by intent
-    intents = {}
-    for ex in examples:
         try:
-            out = json.loads(ex["output"])
-            intent = out.get("intent", "unknown")
-            intents[intent] = intents.get(intent, 0) + 1
-        except Exception:
-            pass
-
-    print("\nBreakdown by intent:")
-    for intent, count in sorted(intents.items(), key=lambda x: -x[1]):
-        print(f"  {intent}: {count}")
-
-    # Breakdown by source_table
-    source_tables = {}
-    for ex in examples:
-        try:
-            out = json.loads(ex["output"])
-            st = out.get("slots", {}).get("source_table", "unspecified")
-            source_tables[st] = source_tables.get(st, 0) + 1
-        except Exception:
-            pass
-
-    print("\nBreakdown by source_table:")
-    for st, count in sorted(source_tables.items(), key=lambda x: -x[1]):
-        print(f"  {st}: {count}")
-
-    print(f"\nTotal: {len(examples)} examples")
+            if parquet:
+                total = save_parquet(_as_examples(pairs), args.output)
+            else:
+                total = write_lines((emit(instruction, output) for instruction, output in pairs), args.output)
+        except ImportError as exc:
+            parser.error(str(exc))
+    if cached is not None:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(args.output, cached)
+        summary.write_text(json.dumps({
+            "intents": intents.most_common(),
+            "source_tables": source_tables.most_common(),
+            "total": total,
+        }), encoding="utf-8")
+
+    _print_summary(intents, source_tables, total, breakdown=not args.quiet)
 
 
 if __name__ == "__main__":
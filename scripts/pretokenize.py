@@ -0,0 +1,140 @@
+"""
+Pre-tokenise T5 Training Data
+==============================
+Tokenises a Spider-format JSONL file once and saves the token ids (int32)
+next to it, so ``fine_tune_t5.py`` can memory-map them instead of
+re-reading and re-tokenising the JSONL on every run.
+
+The output directory is ``<data>.tokenized`` (e.g. ``data/train.jsonl`` →
+``data/train.tokenized/``), which ``load_data()`` in ``fine_tune_t5.py``
+picks up automatically while it is newer than the JSONL. The tokenizer
+and length limits are saved alongside the ids, and ``load_data()`` ignores
+the directory when they differ from the training run's. Re-run this script
+after editing the data or switching the base model.
+
+Usage:
+    python scripts/pretokenize.py --data data/training_data_validated.jsonl
+    python scripts/pretokenize.py --data data/training_data_validated.jsonl --model-name models/fine-tuned-t5/final
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+from datasets import Sequence, Value
+
+from fine_tune_t5 import (
+    DEFAULT_MAX_INPUT_LENGTH,
+    DEFAULT_MAX_TARGET_LENGTH,
+    DEFAULT_MODEL_NAME,
+    PRETOKENIZED_CONFIG,
+    make_tokenize_fn,
+    pretokenized_config,
+    pretokenized_path,
+    read_pairs,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKENIZE_BATCH_SIZE = 10_000
+INT32_COLUMNS = ("input_ids", "attention_mask", "labels")
+
+
+def pretokenize(
+    jsonl_path: str,
+    model_name: str = DEFAULT_MODEL_NAME,
+    max_input_length: int = DEFAULT_MAX_INPUT_LENGTH,
+    max_target_length: int = DEFAULT_MAX_TARGET_LENGTH,
+    num_proc: Optional[int] = None,
+) -> str:
+    """
+    Tokenise *jsonl_path* and save it with ``Dataset.save_to_disk``.
+
+    The saved dataset keeps the ``input``/``target`` text (evaluation needs
+    it) alongside ``input_ids``, ``attention_mask``, ``labels`` (int32) and
+    ``length``, plus a ``PRETOKENIZED_CONFIG`` file recording the tokenizer
+    and length limits the ids were built with.
+
+    Returns:
+        The directory the dataset was saved to.
+    """
+    from transformers import AutoTokenizer
+
+    dataset = read_pairs(jsonl_path)
+    logger.info("Loaded %d pairs from %s", len(dataset), jsonl_path)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    tokenized = dataset.map(
+        make_tokenize_fn(tokenizer, max_input_length, max_target_length),
+        batched=True,
+        batch_size=TOKENIZE_BATCH_SIZE,
+        num_proc=num_proc or os.cpu_count(),
+    )
+
+    features = tokenized.features.copy()
+    for column in INT32_COLUMNS:
+        features[column] = Sequence(Value("int32"))
+    features["length"] = Value("int32")
+    tokenized = tokenized.cast(features)
+
+    out_dir = pretokenized_path(jsonl_path)
+    tokenized.save_to_disk(str(out_dir))
+    config = pretokenized_config(model_name, max_input_length, max_target_length)
+    (out_dir / PRETOKENIZED_CONFIG).write_text(json.dumps(config, indent=2), encoding="utf-8")
+    logger.info("Saved %d tokenised pairs to %s", len(tokenized), out_dir)
+    return str(out_dir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Tokenise Spider-format JSONL once for fine_tune_t5.py.",
+    )
+    parser.add_argument("--data", required=True, help="Path to the JSONL training data file.")
+    parser.add_argument(
+        "--model-name",
+        default=DEFAULT_MODEL_NAME,
+        help=f"Tokenizer to use — must match the model being fine-tuned (default: {DEFAULT_MODEL_NAME}).",
+    )
+    parser.add_argument(
+        "--max-input-length",
+        type=int,
+        default=DEFAULT_MAX_INPUT_LENGTH,
+        help=f"Max tokenised input length (default: {DEFAULT_MAX_INPUT_LENGTH}).",
+    )
+    parser.add_argument(
+        "--max-target-length",
+        type=int,
+        default=DEFAULT_MAX_TARGET_LENGTH,
+        help=f"Max tokenised target length (default: {DEFAULT_MAX_TARGET_LENGTH}).",
+    )
+    parser.add_argument(
+        "--num-proc",
+        type=int,
+        default=None,
+        help="Tokenisation worker processes (default: all CPUs).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    try:
+        pretokenize(
+            args.data,
+            model_name=args.model_name,
+            max_input_length=args.max_input_length,
+            max_target_length=args.max_target_length,
+            num_proc=args.num_proc,
+        )
+    except (FileNotFoundError, ValueError) as exc:
+        logger.error("%s", exc)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
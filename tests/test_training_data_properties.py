@@ -19,7 +19,8 @@ import pytest
 # Add scripts directory to path so we can import the generator
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
 
-from generate_training_data import generate_all_examples
+import generate_training_data
+from generate_training_data import generate_all_examples, iter_pairs
 from app.services.schema_registry import SchemaRegistry
 
 
@@ -57,6 +58,23 @@ def all_training_pairs():
     return generate_all_examples()
 
 
+@pytest.fixture
+def run_generator(tmp_path, monkeypatch, capsys):
+    """
+    Run the generator's ``main()`` writing to ``tmp_path / output_name``.
+
+    Returns the output path and everything the run printed.
+    """
+    def _run(output_name: str, *args: str):
+        output = tmp_path / output_name
+        monkeypatch.setattr(sys, "argv", ["generate_training_data.py", "--output", str(output), *args])
+        capsys.readouterr()
+        generate_training_data.main()
+        return output, capsys.readouterr().out
+
+    return _run
+
+
 @pytest.fixture(scope="module")
 def pairs_with_source_table(all_training_pairs):
     """Extract pairs that have a source_table in their slots."""
@@ -73,6 +91,12 @@ def pairs_with_source_table(all_training_pairs):
 # Helper
 # ---------------------------------------------------------------------------
 
+def _read_jsonl(path) -> list:
+    """Parse every line of a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
 def _extract_metadata_keys_from_sql(sql: str) -> set:
     """Extract all metadata->>'KeyName' references from SQL."""
     return set(METADATA_KEY_PATTERN.findall(sql))
@@ -198,3 +222,91 @@ class TestTrainingDataValidKeys:
         assert len(all_training_pairs) >= 50, (
             f"Dataset has only {len(all_training_pairs)} examples, expected >= 50"
         )
+
+
+class TestTrainingDataDeduplication:
+    """Repeated instructions are dropped, whichever way the generators run."""
+
+    def test_every_instruction_is_unique(self, all_training_pairs):
+        """No instruction appears twice, so none has two competing targets."""
+        counts = {}
+        for pair in all_training_pairs:
+            counts[pair["instruction"]] = counts.get(pair["instruction"], 0) + 1
+        repeated = [instruction for instruction, count in counts.items() if count > 1]
+
+        assert not repeated, (
+            f"Found {len(repeated)} repeated instructions:\n"
+            + "\n".join(repeated[:10])
+        )
+
+    def test_worker_pool_matches_in_process_generation(self):
+        """The process pool yields the same pairs, in the same order."""
+        assert list(iter_pairs(workers=2)) == list(iter_pairs(workers=1))
+
+
+class TestTrainingDataCache:
+    """``--cache-dir`` reuses output only for an identical script and options."""
+
+    def test_cache_hit_matches_fresh_run(self, run_generator, tmp_path):
+        """A cache hit copies bytes identical to regenerating from scratch."""
+        cache_dir = str(tmp_path / "cache")
+        fresh, _ = run_generator("fresh.jsonl", "--cache-dir", cache_dir, "--quiet")
+        cached, out = run_generator("cached.jsonl", "--cache-dir", cache_dir, "--quiet")
+
+        assert "Inputs unchanged" in out
+        assert cached.read_bytes() == fresh.read_bytes()
+
+    def test_cache_hit_prints_same_summary(self, run_generator, tmp_path):
+        """The breakdown and total print the same whether or not the cache was warm."""
+        cache_dir = str(tmp_path / "cache")
+        _, fresh_out = run_generator("fresh.jsonl", "--cache-dir", cache_dir)
+        _, cached_out = run_generator("cached.jsonl", "--cache-dir", cache_dir)
+
+        summary = fresh_out[fresh_out.index("\nBreakdown by intent:"):]
+        assert "Inputs unchanged" in cached_out
+        assert cached_out.endswith(summary)
+
+    @pytest.mark.parametrize("output_name, option", [
+        ("data.jsonl", ("--count", "10")),
+        ("data.json", ()),
+        ("data.jsonl", ("--nested-output",)),
+    ])
+    def test_changed_option_misses_cache(self, output_name, option, run_generator, tmp_path):
+        """Changing --count, the output suffix or --nested-output regenerates."""
+        cache_dir = tmp_path / "cache"
+        run_generator("data.jsonl", "--cache-dir", str(cache_dir), "--quiet")
+        _, out = run_generator(output_name, *option, "--cache-dir", str(cache_dir), "--quiet")
+
+        assert "Inputs unchanged" not in out
+        assert len(list(cache_dir.glob("*.summary.json"))) == 2
+
+
+class TestTrainingDataParquet:
+    """Parquet output carries the same examples as JSONL output."""
+
+    def test_parquet_round_trips_jsonl_columns(self, run_generator):
+        """Reading the Parquet file back gives the JSONL instructions and outputs."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        jsonl_path, _ = run_generator("data.jsonl", "--quiet")
+        parquet_path, _ = run_generator("data.parquet", "--quiet")
+
+        lines = _read_jsonl(jsonl_path)
+        table = pq.read_table(str(parquet_path))
+
+        assert table.column("instruction").to_pylist() == [ex["instruction"] for ex in lines]
+        assert table.column("output").to_pylist() == [ex["output"] for ex in lines]
+
+
+class TestTrainingDataNestedOutput:
+    """``--nested-output`` writes each output as a JSON object, not a string."""
+
+    def test_nested_lines_round_trip_to_string_outputs(self, all_training_pairs, run_generator):
+        """Every line parses, and re-dumping its output object gives the string form."""
+        path, _ = run_generator("nested.jsonl", "--nested-output", "--quiet")
+        lines = _read_jsonl(path)
+
+        assert len(lines) == len(all_training_pairs)
+        for obj, pair in zip(lines, all_training_pairs):
+            assert obj["instruction"] == pair["instruction"]
+            assert isinstance(obj["output"], dict)
+            assert json.dumps(obj["output"]) == pair["output"]